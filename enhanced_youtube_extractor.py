@@ -4,31 +4,574 @@
 対応する字幕とともにスライドに変換します。
 """
 
+import bisect
+import contextlib
+import copy
+import functools
+import gzip
+import hashlib
+import html
+import io
+import itertools
+import json
 import os
+import queue
 import re
+import shutil
+import tempfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from xml.etree import ElementTree
 
 import cv2
 import numpy as np
-import yt_dlp
-from PIL import Image
-from pptx import Presentation
-from pptx.dml.color import RGBColor
-from pptx.util import Inches, Pt
-from youtube_transcript_api import YouTubeTranscriptApi
 
-# 追加: Whisper API連携モジュールをインポート
-try:
-    from whisper_integration import WhisperTranscriptionProvider, TranscriptQualitySelector
-    WHISPER_AVAILABLE = True
-except ImportError:
-    WHISPER_AVAILABLE = False
+# yt_dlp / PIL / pptx / youtube_transcript_api / requests は読み込みが重いため、
+# 起動時間を短くするよう実際に使用するメソッド内でインポートする
+
+# 画面変化位置を二分探索で絞り込む際の最小間隔（秒）
+_CUT_SEARCH_MIN_GAP = 5
+
+# output_dir/.cache のキャッシュ（字幕・動画情報・サムネイル・フレーム抽出結果）の有効期間（秒）
+_CACHE_MAX_AGE = 30 * 24 * 60 * 60
+
+# YouTubeのURLからビデオIDを取り出す正規表現（インスタンスごとに作り直さない）
+# ホスト名の確認とIDの取り出しを1回の検索で行い、11文字でないIDは受け付けない
+_VIDEO_ID_RE = re.compile(
+    r"(?:youtu\.be/|youtube\.com/(?:embed/|shorts/|live/|\S*?[?&]v=))"
+    r"([A-Za-z0-9_-]{11})(?![A-Za-z0-9_-])")
+_RAW_VIDEO_ID_RE = re.compile(r"[A-Za-z0-9_-]{11}")
+# ファイル名に使えない文字（英数字・空白・アンダースコア以外）
+_UNSAFE_TITLE_CHARS_RE = re.compile(r"[^\w\s]")
+
+
+class _ForwardFrameReader:
+    """OpenCVで動画を先頭から順に読み進め、指定時刻のフレームだけを画像に変換するクラス。
+
+    近い時刻へはシークせず grab() で読み飛ばし、必要なフレームだけを
+    retrieve() でBGR画像に変換します。
+    """
+
+    # これより先の時刻へは読み飛ばさずにシークする（秒）。読み飛ばすフレームもデコードが
+    # 必要なため、キーフレーム間隔より十分長い場合はシークして途中からデコードした方が速い
+    SEEK_MIN_GAP = 10.0
+
+    def __init__(self, video_path, hw_decode=False):
+        """初期化メソッド。
+
+        Args:
+            video_path: 動画ファイルのパス
+            hw_decode: 利用できればハードウェアデコーダを使うか
+                （色変換や拡大縮小の処理が異なり、フレームがわずかに変わることがある）
+        """
+        # 指定された場合はハードウェアデコーダを使う（使えない環境ではOpenCVがソフトウェアデコードに切り替える）
+        # 読み飛ばすフレームもデコードは必要なため、長い動画ほどCPU負荷の軽減効果が大きい
+        self.cap = None
+        if hw_decode and hasattr(cv2, "CAP_PROP_HW_ACCELERATION"):
+            self.cap = cv2.VideoCapture(
+                video_path, cv2.CAP_FFMPEG,
+                [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY])
+        if self.cap is None or not self.cap.isOpened():
+            self.cap = cv2.VideoCapture(video_path)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.duration = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT)) / self.fps
+        self.pos = 0  # 次に grab() するフレーム番号
+
+    def read_at(self, sec):
+        """指定時刻のフレームを取得する。
+
+        Args:
+            sec: 取得する時間（秒）
+
+        Returns:
+            numpy.ndarray: BGRフレーム。取得できなかった場合はNone。
+        """
+        index = int(round(sec * self.fps))
+        if index < self.pos or index - self.pos > self.SEEK_MIN_GAP * self.fps:
+            # 読み終えた位置より前に戻る場合と、遠く先へ進む場合だけシークする
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+            self.pos = index
+        while self.pos <= index:
+            if not self.cap.grab():
+                return None
+            self.pos += 1
+        ret, frame = self.cap.retrieve()
+        return frame if ret else None
+
+    def close(self):
+        """動画ファイルを閉じる。"""
+        self.cap.release()
+
+
+class _AVFrameReader:
+    """PyAVで動画を先頭から順にデコードし、指定時刻のフレームだけを画像に変換するクラス。
+
+    libavのマルチスレッドデコードを使い、対象外のフレームはYUVのまま破棄します。
+    遠く先の時刻へは直前のキーフレームへシークしてからデコードします。
+    PyAVがインストールされている場合にのみ使用されます。
+    """
+
+    SEEK_MIN_GAP = _ForwardFrameReader.SEEK_MIN_GAP
+
+    def __init__(self, video_path):
+        """初期化メソッド。
+
+        Args:
+            video_path: 動画ファイルのパス
+        """
+        import av
+        
+        self.container = av.open(video_path)
+        self.stream = self.container.streams.video[0]
+        self.stream.thread_type = "AUTO"
+        self.fps = float(self.stream.average_rate or 30)
+        if self.stream.frames:
+            self.duration = self.stream.frames / self.fps
+        elif self.stream.duration:
+            self.duration = float(self.stream.duration * self.stream.time_base)
+        else:
+            self.duration = (self.container.duration or 0) / av.time_base
+        # 先頭のPTSが0でないストリームでは、フレームの時間が開始時間の分だけずれる
+        self._start_pts = self.stream.start_time or 0
+        self._start_time = float(self._start_pts * self.stream.time_base)
+        self._frames = self.container.decode(self.stream)
+        self._last_time = None  # 最後にデコードしたフレームの時間（秒）
+
+    def read_at(self, sec):
+        """指定時刻のフレームを取得する。
+
+        Args:
+            sec: 取得する時間（秒）
+
+        Returns:
+            numpy.ndarray: BGRフレーム。取得できなかった場合はNone。
+        """
+        # 指定時刻に最も近いフレームを対象にする（OpenCV版のフレーム番号の丸めと同じ）
+        target = self._start_time + sec - 0.5 / self.fps
+        if self._last_time is not None and (
+                self._last_time >= target or target - self._last_time > self.SEEK_MIN_GAP):
+            # 読み終えた位置より前に戻る場合と、遠く先へ進む場合だけ、直前のキーフレームへシークする
+            self.container.seek(self._start_pts + int(sec / self.stream.time_base),
+                                stream=self.stream)
+            self._frames = self.container.decode(self.stream)
+        
+        try:
+            for frame in self._frames:
+                if frame.time is None:
+                    continue
+                self._last_time = frame.time
+                if frame.time >= target:
+                    return frame.to_ndarray(format="bgr24")
+        except Exception as e:
+            # 壊れたパケットなどでデコードできない場合はOpenCV版と同様にNoneを返す
+            print(f"フレームのデコードに失敗しました: {e}")
+            # 例外で終了したデコーダは再開できないため、次の呼び出しでは必ずシークして読み直す
+            self._last_time = float("inf")
+        return None
+
+    def close(self):
+        """動画ファイルを閉じる。"""
+        self.container.close()
+
+
+def _prefetch(iterable, maxsize=4):
+    """イテレータを別スレッドで先読みしながら順に返すジェネレータ。
+
+    動画のデコード（OpenCV・PyAVの処理中はGILが解放される）を、
+    メインスレッドでの類似度計算や保存処理と並行させるために使います。
+    ジェネレータを閉じると先読みスレッドも終了します。
+
+    Args:
+        iterable: 先読みするイテレータ
+        maxsize: 先読みしておく要素の最大数
+
+    Yields:
+        iterable の要素
+    """
+    items = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+    done = object()
+    
+    def put(item):
+        # 受け取り側が終了した場合に備え、待ちながら停止を確認する
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+    
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except Exception as e:
+            put((done, e))
+        else:
+            put((done, None))
+    
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = items.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _read_file(path):
+    """ファイルの内容をバイト列として読み込む。
+
+    Args:
+        path: ファイルのパス
+
+    Returns:
+        bytes: ファイルの内容。読み込めない場合はNone
+    """
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _is_cache_fresh(path):
+    """キャッシュファイルが存在し、有効期間内かどうかを返す。
+
+    Args:
+        path: キャッシュファイルのパス
+
+    Returns:
+        bool: 最終更新から _CACHE_MAX_AGE 以内であればTrue
+    """
+    try:
+        return time.time() - os.path.getmtime(path) <= _CACHE_MAX_AGE
+    except OSError:
+        return False
+
+
+def _evict_expired_cache(cache_root):
+    """有効期間を過ぎたキャッシュを output_dir/.cache から削除する。
+
+    フレーム抽出結果のディレクトリは done.json（ない場合はディレクトリ自体）の
+    更新時刻で判定し、ディレクトリごと削除します。
+
+    Args:
+        cache_root: キャッシュのルートディレクトリ
+    """
+    try:
+        with os.scandir(cache_root) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    manifest_path = os.path.join(entry.path, "done.json")
+                    if not _is_cache_fresh(manifest_path) and not _is_cache_fresh(entry.path):
+                        shutil.rmtree(entry.path, ignore_errors=True)
+                elif not _is_cache_fresh(entry.path):
+                    os.unlink(entry.path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"古いキャッシュの削除に失敗しました: {e}")
+
+
+def _picture_layout(frame_size, slide_width, slide_height):
+    """フレーム画像をスライドに配置する位置と幅を求める。
+
+    スライドの画質向上のため、解像度を考慮した適切なサイズ比率を計算します。
+
+    Args:
+        frame_size: フレームの (幅, 高さ)
+        slide_width: スライドの幅
+        slide_height: スライドの高さ
+
+    Returns:
+        tuple: (画像の左端の位置, 画像の幅)
+    """
+    frame_width, frame_height = frame_size
+    max_img_width = int(slide_width * 0.8)  # 横幅の80%
+    if frame_width and frame_height:
+        slide_aspect_ratio = 16/9  # スライドのアスペクト比（標準的なワイドスクリーン）
+        
+        # アスペクト比を考慮して配置する画像の幅を決定
+        if frame_width/frame_height > slide_aspect_ratio:
+            # 横長の画像の場合、幅を基準に調整（横幅の80%に拡大）
+            img_width = max_img_width
+        else:
+            # 縦長または正方形の画像の場合、高さを基準に調整（高さの60%に拡大）
+            img_height = int(slide_height * 0.6)
+            # 幅が横幅の80%を超える場合は調整
+            img_width = min(int(img_height * frame_width / frame_height), max_img_width)
+    else:
+        # サイズが不明な場合はデフォルト値を使用
+        img_width = max_img_width
+    
+    # 画像を中央に配置（高さは縦横比を保つようにpython-pptxが決める）
+    return int((slide_width - img_width) / 2), img_width
+
+
+def _join_transcript_window(entries, time_sec, window_size, compact_text):
+    """指定時間付近の字幕エントリのテキストを結合する。
+
+    Args:
+        entries: 時間順に並んだ、指定時間付近の字幕エントリ
+        time_sec: 検索する時間（秒）
+        window_size: 検索する時間範囲（秒）
+        compact_text: 近い時間の字幕を改行せずにまとめるか
+
+    Returns:
+        str: テキスト
+    """
+    # 指定時間範囲内のエントリーのテキストを集め、最後に一度だけ結合する
+    # （コンパクトモードでは近い時間の字幕もそれ以外もスペースでつながるため、
+    # まとめる処理を挟まずに全体をスペースで結合すれば同じ結果になる）
+    relevant_parts = [
+        text for text in (
+            entry['text'].strip() for entry in entries
+            if abs(entry['start'] - time_sec) <= window_size)
+        if text
+    ]
+    
+    # コンパクトモードはスペースで結合（改行なし）
+    return " ".join(relevant_parts) if compact_text else "\n".join(relevant_parts)
+
+
+def _transcript_entry_from_dict(entry):
+    """辞書形式の字幕エントリ（youtube_transcript_api の旧バージョン）を標準の辞書に変換する。"""
+    return {
+        'start': float(entry['start']),
+        'text': str(entry['text']),
+        'duration': float(entry.get('duration', 0))
+    }
+
+
+def _transcript_entry_from_object(entry):
+    """オブジェクト形式の字幕エントリ（youtube_transcript_api 1.x）を標準の辞書に変換する。"""
+    return {
+        'start': float(entry.start),
+        'text': str(entry.text),
+        'duration': float(getattr(entry, 'duration', 0))
+    }
+
+
+class _TranscriptCursor:
+    """時間順に処理するフレームに対して、字幕の検索範囲を前方へ進めながら求めるクラス。
+
+    フレームの時間は単調に増加するため、検索範囲の両端を進めるだけで済み、
+    字幕全体の処理は1回の走査で終わります。
+    """
+
+    def __init__(self, entries, starts, window_size, compact_text):
+        """初期化メソッド。
+
+        Args:
+            entries: 時間順に並べた字幕データ
+            starts: entries の開始時間のリスト
+            window_size: 検索する時間範囲（秒）
+            compact_text: 近い時間の字幕を改行せずにまとめるか
+        """
+        self.entries = entries
+        self.starts = starts
+        self.window_size = window_size
+        self.compact_text = compact_text
+        self.lo = 0
+        self.hi = 0
+
+    def text_at(self, time_sec):
+        """指定された時間付近の字幕テキストを取得する。
+
+        Args:
+            time_sec: 検索する時間（秒）
+
+        Returns:
+            str: テキスト
+        """
+        # 境界の丸め誤差に備えて少し広めに取り、判定は _join_transcript_window で行う
+        low = time_sec - self.window_size - 1e-6
+        high = time_sec + self.window_size + 1e-6
+        if self.lo > 0 and self.starts[self.lo - 1] >= low:
+            # 前の時間に戻った場合だけ二分探索でやり直す
+            self.lo = bisect.bisect_left(self.starts, low)
+            self.hi = self.lo
+        while self.lo < len(self.starts) and self.starts[self.lo] < low:
+            self.lo += 1
+        self.hi = max(self.hi, self.lo)
+        while self.hi < len(self.starts) and self.starts[self.hi] <= high:
+            self.hi += 1
+        return _join_transcript_window(
+            self.entries[self.lo:self.hi], time_sec, self.window_size, self.compact_text)
+
+
+def _phash(gray):
+    """グレースケール画像の64ビット知覚ハッシュ（pHash）を計算する。
+
+    32x32に縮小してDCTを取り、低周波成分8x8が中央値より大きいかどうかを
+    ビットとして並べます（cv2.img_hash はopencv-contribにしかないため自前で計算）。
+
+    Args:
+        gray: グレースケール画像
+
+    Returns:
+        int: 64ビットのハッシュ値
+    """
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8]
+    bits = np.packbits((low > np.median(low)).ravel())
+    return int.from_bytes(bits.tobytes(), "big")
+
+
+def _fmt_hms(seconds):
+    """秒数を HH:MM:SS 形式の文字列に変換する。
+
+    Args:
+        seconds: 動画の先頭からの秒数（小数部分は切り捨て）
+
+    Returns:
+        str: HH:MM:SS 形式の文字列
+    """
+    s = int(seconds)
+    return f"{s // 3600:02d}:{s % 3600 // 60:02d}:{s % 60:02d}"
+
+
+def _video_only_format(video_format):
+    """yt-dlpのフォーマット指定から音声の結合（+bestaudio など）を取り除く。
+
+    フレームの抽出には映像しか使わないため、音声のダウンロードとffmpegによる
+    結合処理を省けます。
+
+    Args:
+        video_format: yt-dlpのフォーマット指定（'/' 区切りの候補）
+
+    Returns:
+        str: 各候補を映像部分だけにしたフォーマット指定
+    """
+    return "/".join(alternative.split("+")[0] for alternative in video_format.split("/"))
+
+
+@functools.lru_cache(maxsize=None)
+def _http_session():
+    """YouTubeへのHTTP通信で共有するセッションを作成する（初回のみ）。
+
+    接続を使い回すことで、字幕やサムネイルの取得ごとのTLSハンドシェイクを省きます。
+
+    Returns:
+        requests.Session: 圧縮転送を有効にしたセッション
+    """
+    import requests
+    
+    session = requests.Session()
+    session.headers["Accept-Encoding"] = "gzip, deflate"
+    return session
+
+
+@functools.lru_cache(maxsize=None)
+def _pyav_available():
+    """PyAVが利用可能かどうかを確認する（初回のみ）。
+
+    Returns:
+        bool: av をインポートできる場合はTrue
+    """
+    try:
+        import av  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+@functools.lru_cache(maxsize=None)
+def _turbojpeg():
+    """libjpeg-turbo（PyTurboJPEG）を読み込む（初回のみ）。
+
+    ハフマンテーブルの最適化（OpenCVの IMWRITE_JPEG_OPTIMIZE に相当）ができない
+    古いバージョンは、インストールの有無で出力が変わらないよう使用しません。
+
+    Returns:
+        tuple: (TurboJPEGのインスタンス, 4:2:0サブサンプリングの定数)。使えない場合はNone。
+    """
+    try:
+        from turbojpeg import TJSAMP_420, TurboJPEG
+        
+        if not hasattr(TurboJPEG, "optimize"):
+            return None
+        return TurboJPEG(), TJSAMP_420
+    except Exception:
+        # パッケージがない場合に加え、libturbojpeg本体が見つからない場合も含む
+        return None
+
+
+def _tj_encode_optimized(turbo, frame, quality, jpeg_subsample):
+    """libjpeg-turboでフレームをJPEGにエンコードし、ハフマンテーブルを最適化する。
+
+    PyTurboJPEGの encode には最適化のフラグがないため、エンコード後に無劣化で
+    最適化し、OpenCV（IMWRITE_JPEG_OPTIMIZE）で保存した場合と同程度のサイズにします。
+
+    Args:
+        turbo: TurboJPEGのインスタンス
+        frame: BGRフレーム
+        quality: JPEGの品質 (1-100)
+        jpeg_subsample: クロマサブサンプリングの定数
+
+    Returns:
+        bytes: JPEGデータ
+    """
+    return turbo.optimize(turbo.encode(frame, quality=quality, jpeg_subsample=jpeg_subsample))
+
+
+@functools.lru_cache(maxsize=None)
+def _pptx_template_bytes():
+    """python-pptxの既定のテンプレート（default.pptx）の内容を読み込む（初回のみ）。
+
+    同じプロセスで複数の動画を処理する場合に、テンプレートをファイルから読み直さないようにします。
+
+    Returns:
+        bytes: テンプレートの内容
+    """
+    import pptx
+    
+    template_path = os.path.join(os.path.dirname(pptx.__file__), "templates", "default.pptx")
+    with open(template_path, "rb") as f:
+        return f.read()
+
+
+def _whisper_available():
+    """Whisper API連携モジュールが利用可能かどうかを確認する。
+
+    Returns:
+        bool: whisper_integration をインポートできる場合はTrue
+    """
+    try:
+        import whisper_integration  # noqa: F401
+    except ImportError:
+        return False
+    return True
 
 
 class EnhancedYouTubeTutorialExtractor:
     """YouTubeチュートリアル動画から画像とテキストを抽出し、スライドを生成するクラス。"""
 
+    # 属性を固定してインスタンスごとの __dict__ を持たないようにする
+    # （新しい属性を追加する場合はここにも追加すること）
+    __slots__ = (
+        "url", "output_dir", "interval", "lang", "format_type", "compact_text",
+        "max_text_length", "screen_change_threshold", "image_quality", "video_format",
+        "add_thumbnail", "video_id", "temp_dir", "use_whisper", "whisper_api_key",
+        "whisper_model", "force_whisper", "sparse_download", "use_cache", "cache_dir",
+        "refine_scene_changes", "similarity_method", "max_frame_width", "_use_phash",
+        "_jpeg_params", "_prev_signature", "_use_umat", "_video_path",
+        "hw_decode", "_thumb_wh", "_small_buf", "_gray_buf", "_transcript_index", "_tj_encode",
+        "_frame_path_fmt", "_section_path_fmt", "_cache_key", "_cache_manifest_path",
+        "_cache_root", "_yt_info", "_frame_blobs",
+    )
+
     def __init__(
             self,
             url,
@@ -45,7 +588,14 @@ class EnhancedYouTubeTutorialExtractor:
             use_whisper=False,
             whisper_api_key=None,
             whisper_model="medium",
-            force_whisper=False):
+            force_whisper=False,
+            sparse_download=False,
+            use_cache=True,
+            refine_scene_changes=False,
+            similarity_method="histogram",
+            max_frame_width=1280,
+            use_opencl=False,
+            hw_decode=False):
         """初期化メソッド。
 
         Args:
@@ -64,6 +614,20 @@ class EnhancedYouTubeTutorialExtractor:
             whisper_api_key: Whisper API（OpenAI API）のキー
             whisper_model: 使用するWhisperモデル
             force_whisper: 品質評価にかかわらず常にWhisper APIの結果を使用するか
+            sparse_download: 抽出時刻の前後だけを部分ダウンロードするか
+                （Whisper API使用時は音声のみを別途ダウンロードする）
+            use_cache: 抽出したフレーム・字幕・動画情報を output_dir/.cache に保存し、
+                同じ条件での再実行時に再利用するか
+            refine_scene_changes: インターバル間で画面が変化した場合に、
+                二分探索で変化直後のフレームを探して追加するか
+            similarity_method: 画面変化検出の類似度の計算方法
+                ("histogram": 輝度ヒストグラムの相関, "phash": 64ビットの知覚ハッシュ)
+            max_frame_width: 保存するフレーム画像の最大幅（ピクセル）。これより大きいフレームは
+                スライドに表示する大きさに合わせて縮小して保存する（0 または None で縮小しない）
+            use_opencl: 画面変化検出用の縮小・グレースケール変換をOpenCL（T-API）で行うか。
+                フレーム全体をデバイスへ転送するため通常はCPUより遅く、結果もわずかに異なりうる
+            hw_decode: PyAVを使わない場合に、OpenCVでハードウェアデコーダを使うか
+                （色変換や拡大縮小の処理が異なり、フレームがわずかに異なりうる）
         """
         self.url = url
         self.output_dir = output_dir
@@ -74,20 +638,115 @@ class EnhancedYouTubeTutorialExtractor:
         self.max_text_length = max_text_length
         self.screen_change_threshold = screen_change_threshold
         self.image_quality = image_quality
+        # JPEG保存パラメータ（フレームごとに作り直さないよう一度だけ作成）
+        self._jpeg_params = [
+            cv2.IMWRITE_JPEG_QUALITY, int(image_quality),
+            cv2.IMWRITE_JPEG_OPTIMIZE, 1,
+        ]
+        # libjpeg-turboが使える場合はフレームのエンコードに使用する
+        turbo = _turbojpeg()
+        self._tj_encode = None if turbo is None else functools.partial(
+            _tj_encode_optimized, turbo[0], quality=int(image_quality), jpeg_subsample=turbo[1])
         self.video_format = video_format
         self.add_thumbnail = add_thumbnail
         self.video_id = self.extract_video_id()  # メソッド名を修正
-        self.temp_dir = os.path.join(output_dir, "temp")
+        # ビデオIDのみ・youtu.be・embed/shorts/live形式も通常のURLに変換する
+        # （スライドのリンクに「&t=秒」を付けるため、常にwatch?v=の形にしておく）
+        self.url = f"https://www.youtube.com/watch?v={self.video_id}"
+        self._prev_signature = None  # 画面変化検出用: 直前フレームの特徴（ヒストグラムまたはハッシュ）
+        self._transcript_index = None  # 時間順に並べた字幕と開始時間のリスト（字幕ごとに一度だけ作成）
+        self._yt_info = None  # get_video_info で取得したyt-dlpの動画情報（ダウンロード時に再利用）
+        self._frame_blobs = {}  # 保存したフレーム画像のパスとJPEGデータ（スライド作成時に読み直さない）
+        # 画面変化検出用の縮小画像のバッファ（フレームごとに確保し直さない）
+        self._thumb_wh = (64, 36)
+        self._small_buf = np.empty((self._thumb_wh[1], self._thumb_wh[0], 3), np.uint8)
+        # グレースケール画像のバッファ（直前フレームとは特徴だけを比較するため1面で足りる）
+        self._gray_buf = np.empty((self._thumb_wh[1], self._thumb_wh[0]), np.uint8)
+        # 指定された場合のみ、OpenCLが使える環境で縮小・グレースケール変換をGPU（T-API）で行う
+        self._use_umat = use_opencl and cv2.ocl.haveOpenCL() and cv2.ocl.useOpenCL()
+        self.hw_decode = hw_decode
         
         # 追加: Whisper API関連の設定
-        self.use_whisper = use_whisper and WHISPER_AVAILABLE
+        # Whisper API連携モジュールは使用する場合にのみ読み込む
+        self.use_whisper = use_whisper and _whisper_available()
         self.whisper_api_key = whisper_api_key
         self.whisper_model = whisper_model
         self.force_whisper = force_whisper
         
+        # Whisper API使用時は、部分ダウンロードと別に音声のみをダウンロードする
+        self.sparse_download = sparse_download
+        self.refine_scene_changes = refine_scene_changes
+        if similarity_method not in ("histogram", "phash"):
+            raise ValueError(f"無効な類似度の計算方法です: {similarity_method}")
+        self.similarity_method = similarity_method
+        self._use_phash = similarity_method == "phash"
+        self.max_frame_width = max_frame_width or 0
+        
         # 必要なディレクトリを作成
         os.makedirs(self.output_dir, exist_ok=True)
-        os.makedirs(self.temp_dir, exist_ok=True)
+        # 一時ディレクトリはインスタンスごとに新しく作る（同じ出力ディレクトリで並行して
+        # 実行しても互いのファイルを消さず、前回の実行で残ったフレームも再利用しない）
+        self.temp_dir = tempfile.mkdtemp(prefix="temp_", dir=self.output_dir)
+        
+        # 一時ファイルのパスは一度だけ組み立てる（フレームのループ内でjoinしない）
+        self._video_path = os.path.join(self.temp_dir, f"{self.video_id}.mp4")
+        self._frame_path_fmt = os.path.join(self.temp_dir, "frame_{}.jpg").format
+        self._section_path_fmt = os.path.join(self.temp_dir, self.video_id + "_{}.mp4").format
+        
+        # 抽出結果のキャッシュ（抽出結果に影響する設定ごとに別のディレクトリを使う）
+        self.use_cache = use_cache
+        self._cache_key = hashlib.blake2b(
+            f"{self.video_id}|{self.interval}|{self.screen_change_threshold}|{self.lang}|"
+            f"{self.image_quality}|{self.max_text_length}|{self.compact_text}|"
+            f"{self.sparse_download}|{self.use_whisper}|{self.force_whisper}|"
+            f"{self.refine_scene_changes}|{self.similarity_method}|{self.max_frame_width}|"
+            f"{self.video_format}|{self._use_umat}|{self.hw_decode}".encode(),
+            digest_size=8).hexdigest()
+        self._cache_root = os.path.join(self.output_dir, ".cache")
+        self.cache_dir = os.path.join(self._cache_root, self._cache_key)
+        self._cache_manifest_path = os.path.join(self.cache_dir, "done.json")
+        
+    def _load_json_cache(self, name):
+        """output_dir/.cache に保存したgzip圧縮のJSONを読み込む。
+
+        Args:
+            name: キャッシュファイル名
+            
+        Returns:
+            キャッシュされた値。キャッシュがないか有効期間を過ぎている場合はNone
+        """
+        if not self.use_cache:
+            return None
+        path = os.path.join(self._cache_root, name)
+        try:
+            if not _is_cache_fresh(path):
+                return None
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"キャッシュの読み込みに失敗しました: {e}")
+            return None
+    
+    def _save_json_cache(self, name, value):
+        """値をgzip圧縮のJSONとして output_dir/.cache に保存する。
+
+        Args:
+            name: キャッシュファイル名
+            value: 保存する値（JSONに変換できるもの）
+        """
+        if not self.use_cache:
+            return
+        path = os.path.join(self._cache_root, name)
+        try:
+            os.makedirs(self._cache_root, exist_ok=True)
+            tmp_path = path + ".tmp"
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                json.dump(value, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"キャッシュの保存に失敗しました: {e}")
         
     def extract_video_id(self):  # メソッド名を修正
         """YouTubeのURLからビデオIDを抽出する。
@@ -98,19 +757,17 @@ class EnhancedYouTubeTutorialExtractor:
         Raises:
             ValueError: URLが無効な場合
         """
-        if "youtu.be" in self.url:
-            video_id = self.url.split("/")[-1]
-            if "?" in video_id:
-                video_id = video_id.split("?")[0]
-            return video_id
-        elif "youtube.com" in self.url:
-            match = re.search(r"v=([^&]+)", self.url)
-            if match:
-                return match.group(1)
-            else:
-                raise ValueError("YouTubeのビデオIDが見つかりませんでした")
-        else:
+        # URLではなく11文字のビデオIDが直接渡された場合
+        if _RAW_VIDEO_ID_RE.fullmatch(self.url):
+            return self.url
+        
+        match = _VIDEO_ID_RE.search(self.url)
+        if match:
+            return match.group(1)
+        
+        if "youtu.be" not in self.url and "youtube.com" not in self.url:
             raise ValueError("無効なYouTube URLです")
+        raise ValueError("YouTubeのビデオIDが見つかりませんでした")
     
     def get_video_info(self):
         """動画のタイトルと説明を取得する。
@@ -119,73 +776,55 @@ class EnhancedYouTubeTutorialExtractor:
             dict: 動画のメタデータを含む辞書
         """
         try:
-            # yt-dlpの設定オプション
-            ydl_opts = {
-                'skip_download': True,
-                'quiet': True,
-                'no_warnings': True,
-            }
+            # タイトルなどはほとんど変わらないため、キャッシュがあればyt-dlpを呼ばない
+            info_cache_name = f"{self.video_id}_info.json.gz"
+            info = self._load_json_cache(info_cache_name)
+            if info is None:
+                info = self._fetch_video_metadata()
+                self._save_json_cache(info_cache_name, info)
             
-            # yt-dlpを使って情報を取得
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(self.url, download=False)
-            
-            # 情報を取得
-            title = info.get('title', '不明なタイトル')
-            author = info.get('uploader', '不明な作成者')
-            description = info.get('description', '')
-            length = info.get('duration', 0)
-            
-            # サムネイル画像のURLを取得
-            thumbnails = info.get('thumbnails', [])
-            thumbnail_url = None
-            # 利用可能な最高品質のサムネイルを探す
-            if thumbnails:
-                # 解像度で並べ替え（高解像度のものを優先）
-                sorted_thumbnails = sorted(
-                    [t for t in thumbnails if 'width' in t and 'height' in t],
-                    key=lambda x: x.get('width', 0) * x.get('height', 0),
-                    reverse=True
-                )
-                if sorted_thumbnails:
-                    thumbnail_url = sorted_thumbnails[0].get('url')
-            
-            # サムネイルのダウンロード
+            title = info['title']
+            author = info['author']
+            description = info['description']
+            length = info['length']
+            thumbnail_url = info['thumbnail_url']
+            
+            # サムネイルのダウンロード（変換済みの画像がキャッシュにあればそれを使う）
             thumbnail_path = None
-            if thumbnail_url:
+            thumbnail_cache_path = os.path.join(self._cache_root, f"{self.video_id}_thumbnail.jpg")
+            if self.use_cache and thumbnail_url and _is_cache_fresh(thumbnail_cache_path):
+                thumbnail_path = os.path.join(self.temp_dir, f"{self.video_id}_thumbnail.jpg")
+                shutil.copyfile(thumbnail_cache_path, thumbnail_path)
+            elif thumbnail_url:
                 try:
-                    import requests
-                    from PIL import Image
-                    import io
-                    
-                    # まずメモリにダウンロード
-                    response = requests.get(thumbnail_url, stream=True)
+                    # 一時ファイルを介さずメモリ上で受け取る（サムネイルは数百KB程度）
+                    response = _http_session().get(thumbnail_url, timeout=10)
                     if response.status_code == 200:
-                        # 一時的なWebPファイル
-                        temp_thumbnail = os.path.join(self.temp_dir, f"{self.video_id}_thumbnail_temp")
-                        with open(temp_thumbnail, 'wb') as f:
-                            for chunk in response.iter_content(1024):
-                                f.write(chunk)
-                        
-                        # PILを使って画像を開き、JPG形式で保存（PowerPoint互換）
                         thumbnail_path = os.path.join(self.temp_dir, f"{self.video_id}_thumbnail.jpg")
                         try:
-                            img = Image.open(temp_thumbnail)
-                            # RGBAの場合はRGBに変換（透過部分は白に）
-                            if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
-                                background = Image.new('RGB', img.size, (255, 255, 255))
-                                background.paste(img, mask=img.split()[3] if img.mode == 'RGBA' else None)
-                                background.save(thumbnail_path, 'JPEG', quality=95)
+                            content = response.content
+                            if self._is_passthrough_jpeg(content):
+                                # 縮小の必要がないJPEGは再圧縮せずにそのまま保存する
+                                with open(thumbnail_path, "wb") as f:
+                                    f.write(content)
                             else:
-                                img.convert('RGB').save(thumbnail_path, 'JPEG', quality=95)
-                            
-                            # 一時ファイルを削除
-                            if os.path.exists(temp_thumbnail):
-                                os.remove(temp_thumbnail)
+                                # OpenCVでメモリ上の画像をデコードし、縮小してJPG形式で保存（PowerPoint互換）
+                                img = cv2.imdecode(np.frombuffer(content, np.uint8), cv2.IMREAD_UNCHANGED)
+                                if img is None:
+                                    raise ValueError("画像を読み込めませんでした")
+                                if img.ndim == 2:
+                                    img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+                                elif img.shape[2] == 4:
+                                    # RGBAの場合はRGBに変換（透過部分は白に）
+                                    alpha = img[:, :, 3:4].astype(np.float32) / 255.0
+                                    img = (img[:, :, :3] * alpha + 255.0 * (1.0 - alpha)).astype(np.uint8)
+                                img = self._make_thumbnail(img)
+                                cv2.imwrite(thumbnail_path, img, [cv2.IMWRITE_JPEG_QUALITY, 95])
+                            if self.use_cache:
+                                os.makedirs(self._cache_root, exist_ok=True)
+                                shutil.copyfile(thumbnail_path, thumbnail_cache_path)
                         except Exception as e:
                             print(f"サムネイル画像の変換に失敗しました: {e}")
-                            if os.path.exists(temp_thumbnail):
-                                os.remove(temp_thumbnail)
                             thumbnail_path = None
                     else:
                         print(f"サムネイル取得エラー: HTTPステータス {response.status_code}")
@@ -227,6 +866,99 @@ class EnhancedYouTubeTutorialExtractor:
                 "thumbnail_path": None
             }
     
+    def _fetch_video_metadata(self):
+        """yt-dlpで動画のメタデータを取得する。
+
+        Returns:
+            dict: タイトル・作成者・説明・長さ・公開日（YYYYMMDD）・サムネイルURL
+        """
+        import yt_dlp
+        
+        # yt-dlpの設定オプション
+        ydl_opts = {
+            'skip_download': True,
+            'quiet': True,
+            'no_warnings': True,
+        }
+        
+        # yt-dlpを使って情報を取得（ダウンロード時に再取得しないよう保持する）
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(self.url, download=False)
+        self._yt_info = info
+        
+        # サムネイル画像のURLを取得
+        thumbnails = info.get('thumbnails', [])
+        thumbnail_url = None
+        # 利用可能な最高品質のサムネイルを探す
+        if thumbnails:
+            # 解像度で並べ替え（高解像度のものを優先）
+            sorted_thumbnails = sorted(
+                [t for t in thumbnails if 'width' in t and 'height' in t],
+                key=lambda x: x.get('width', 0) * x.get('height', 0),
+                reverse=True
+            )
+            if sorted_thumbnails:
+                thumbnail_url = sorted_thumbnails[0].get('url')
+        
+        return {
+            "title": info.get('title', '不明なタイトル'),
+            "author": info.get('uploader', '不明な作成者'),
+            "description": info.get('description', ''),
+            "length": info.get('duration', 0),
+            "upload_date": info.get('upload_date'),
+            "thumbnail_url": thumbnail_url,
+        }
+    
+    def _ydl_extract(self, ydl, download=True):
+        """yt-dlpで動画を処理する（取得済みの動画情報があれば再取得しない）。
+
+        Args:
+            ydl: yt_dlp.YoutubeDL のインスタンス
+            download: ダウンロードするかどうか
+            
+        Returns:
+            dict: yt-dlpの動画情報
+        """
+        if self._yt_info is not None:
+            # フォーマットの選択などで書き換えられるため、コピーを渡す
+            return ydl.process_ie_result(copy.deepcopy(self._yt_info), download=download)
+        return ydl.extract_info(self.url, download=download)
+    
+    def _is_passthrough_jpeg(self, content, max_w=1280):
+        """ダウンロードした画像が、変換せずに使えるJPEGかどうかを判定する。
+
+        PILはヘッダーだけを読むため、画素のデコードは行いません。
+
+        Args:
+            content: 画像ファイルの内容
+            max_w: 最大幅（ピクセル）
+            
+        Returns:
+            bool: JPEGで、幅が max_w 以下の場合はTrue
+        """
+        if content[:3] != b"\xff\xd8\xff":
+            return False
+        from PIL import Image
+        
+        with Image.open(io.BytesIO(content)) as img:
+            return img.format == "JPEG" and img.mode in ("RGB", "L") and img.size[0] <= max_w
+    
+    def _make_thumbnail(self, image_bgr, max_w=1280):
+        """画像を指定した幅以下に縮小する（拡大はしない）。
+
+        Args:
+            image_bgr: BGR画像
+            max_w: 最大幅（ピクセル）
+            
+        Returns:
+            numpy.ndarray: 縮小後のBGR画像
+        """
+        h, w = image_bgr.shape[:2]
+        if w <= max_w:
+            return image_bgr
+        # 縮小にはINTER_AREAを使用（高速かつ縮小時の画質が良い）
+        return cv2.resize(image_bgr, (max_w, int(h * max_w / w)), interpolation=cv2.INTER_AREA)
+    
     def download_transcript(self, video_path=None):
         """字幕をダウンロードする。
         
@@ -234,81 +966,60 @@ class EnhancedYouTubeTutorialExtractor:
         より品質の高い方を返します。force_whisperが有効な場合は常にWhisper APIの結果を優先します。
 
         Args:
-            video_path: 動画ファイルのパス（Whisper API使用時に必要）
+            video_path: 動画ファイルのパス（Whisper API使用時。省略時は音声のみをダウンロード）
             
         Returns:
             list: 字幕データのリスト
         """
-        youtube_transcript = []
-        
-        # YouTubeから字幕を取得
-        try:
-            transcript_list = YouTubeTranscriptApi.list_transcripts(self.video_id)
-            
-            # 指定された言語の字幕を探す
-            transcript = None
-            for t in transcript_list:
-                if t.language_code == self.lang:
-                    transcript = t
-                    break
-            
-            # 指定言語が見つからない場合は自動生成字幕を探す
-            if transcript is None:
-                for t in transcript_list:
-                    if t.is_generated:
-                        transcript = t
-                        if t.language_code != self.lang:
-                            transcript = t.translate(self.lang)
-                        break
-            
-            # それでも見つからなければデフォルトのものを使用
-            if transcript is None:
-                transcript = transcript_list.find_transcript([self.lang, 'en'])
-            
-            # 字幕データを取得
-            transcript_data = transcript.fetch()
-            
-            # データ形式を確認して標準化（辞書形式に統一）
-            standardized_data = []
-            for entry in transcript_data:
-                # 既に辞書形式かチェック
-                if isinstance(entry, dict) and 'start' in entry and 'text' in entry:
-                    standardized_data.append({
-                        'start': float(entry['start']),
-                        'text': str(entry['text']),
-                        'duration': float(entry.get('duration', 0))
-                    })
-                # オブジェクト形式の場合
-                elif hasattr(entry, 'start') and hasattr(entry, 'text'):
-                    standardized_data.append({
-                        'start': float(entry.start),
-                        'text': str(entry.text),
-                        'duration': float(getattr(entry, 'duration', 0))
-                    })
-                # その他の場合はスキップ
-                else:
-                    print(f"未対応の字幕データ形式です: {type(entry)}")
-            
-            youtube_transcript = standardized_data
-        except Exception as e:
-            print(f"YouTubeからの字幕ダウンロードに失敗しました: {e}")
+        # YouTubeから字幕を取得（youtube_transcript_api で取得し、取れなければ
+        # 共有セッションでtimedtextを直接取得する）。取得済みの字幕はキャッシュから読む
+        youtube_cache_name = f"{self.video_id}_{self.lang}.json.gz"
+        youtube_transcript = self._load_json_cache(youtube_cache_name)
+        if youtube_transcript is None:
+            try:
+                youtube_transcript = self._fetch_transcript_api()
+            except Exception as e:
+                print(f"YouTubeからの字幕ダウンロードに失敗しました: {e}")
+            if not youtube_transcript:
+                # timedtextは空のレスポンスを返すことが多いため、代替としてだけ使う
+                youtube_transcript = self._fetch_transcript_fast()
+            if youtube_transcript:
+                self._save_json_cache(youtube_cache_name, youtube_transcript)
         
         # Whisper APIが有効で、API KEYが設定されている場合は音声認識を実行
+        whisper_cache_name = f"{self.video_id}_{self.lang}_whisper.json.gz"
         whisper_transcript = []
-        if self.use_whisper and self.whisper_api_key and video_path:
+        if self.use_whisper and self.whisper_api_key:
+            whisper_transcript = self._load_json_cache(whisper_cache_name) or []
+        if self.use_whisper and self.whisper_api_key and not whisper_transcript:
             try:
-                print("Whisper APIで音声認識を実行しています...")
-                whisper_provider = WhisperTranscriptionProvider(
-                    api_key=self.whisper_api_key,
-                    language=self.lang,
-                    model=self.whisper_model
-                )
-                whisper_transcript = whisper_provider.get_transcript(video_path, self.temp_dir)
+                from whisper_integration import TranscriptQualitySelector, WhisperTranscriptionProvider
+                
+                # YouTubeの字幕の品質が最高の場合、比較でWhisperの結果が選ばれることはないため省略する
+                if not TranscriptQualitySelector.should_run_whisper(youtube_transcript, self.force_whisper):
+                    print("YouTubeの字幕の品質が十分なため、Whisper APIによる音声認識を省略します")
+                else:
+                    # 動画全体をダウンロードしていない場合は音声だけをダウンロードする
+                    if not video_path:
+                        video_path = self._download_audio_only()
+                        if not video_path:
+                            raise Exception("音声のダウンロードに失敗しました")
+                    
+                    print("Whisper APIで音声認識を実行しています...")
+                    whisper_provider = WhisperTranscriptionProvider(
+                        api_key=self.whisper_api_key,
+                        language=self.lang,
+                        model=self.whisper_model
+                    )
+                    whisper_transcript = whisper_provider.get_transcript(video_path, self.temp_dir)
+                    if whisper_transcript:
+                        self._save_json_cache(whisper_cache_name, whisper_transcript)
             except Exception as e:
                 print(f"Whisper APIによる音声認識に失敗しました: {e}")
         
         # YouTubeとWhisperの両方から字幕が取得できた場合、選択ロジックを適用
         if youtube_transcript and whisper_transcript:
+            from whisper_integration import TranscriptQualitySelector
             return TranscriptQualitySelector.select_best_transcript(
                 youtube_transcript, whisper_transcript, force_whisper=self.force_whisper)
         # どちらか一方しか取得できなかった場合はそれを返す
@@ -320,6 +1031,102 @@ class EnhancedYouTubeTutorialExtractor:
         else:
             return []
     
+    def _fetch_transcript_fast(self):
+        """共有HTTPセッションでYouTubeのtimedtextから字幕を直接取得する。
+
+        XMLはストリーミングで解析します。字幕が公開されていない場合や
+        取得に失敗した場合は空リストを返します。
+
+        Returns:
+            list: 字幕データのリスト
+        """
+        try:
+            # ストリーミングのレスポンスは途中で返る場合も閉じて、接続をプールに戻す
+            with _http_session().get(
+                    "https://www.youtube.com/api/timedtext",
+                    params={"v": self.video_id, "lang": self.lang},
+                    stream=True, timeout=10) as response:
+                if response.status_code != 200:
+                    return []
+                response.raw.decode_content = True
+                
+                transcript = []
+                for _, elem in ElementTree.iterparse(response.raw):
+                    if elem.tag == "text":
+                        transcript.append({
+                            'start': float(elem.get('start', 0)),
+                            'text': html.unescape(elem.text or ''),
+                            'duration': float(elem.get('dur', 0))
+                        })
+                    elem.clear()
+            return transcript
+        except ElementTree.ParseError:
+            # 字幕がない場合は空のレスポンスが返る
+            return []
+        except Exception as e:
+            print(f"timedtextからの字幕取得に失敗しました: {e}")
+            return []
+    
+    def _fetch_transcript_api(self):
+        """youtube_transcript_api を使って字幕を取得する。
+
+        Returns:
+            list: 字幕データのリスト
+        """
+        from youtube_transcript_api import YouTubeTranscriptApi
+        
+        transcript_list = YouTubeTranscriptApi.list_transcripts(self.video_id)
+        
+        # 指定された言語の字幕を探す
+        transcript = None
+        for t in transcript_list:
+            if t.language_code == self.lang:
+                transcript = t
+                break
+        
+        # 指定言語が見つからない場合は自動生成字幕を探す
+        if transcript is None:
+            for t in transcript_list:
+                if t.is_generated:
+                    transcript = t
+                    if t.language_code != self.lang:
+                        transcript = t.translate(self.lang)
+                    break
+        
+        # それでも見つからなければデフォルトのものを使用
+        if transcript is None:
+            transcript = transcript_list.find_transcript([self.lang, 'en'])
+        
+        # 字幕データを取得
+        transcript_data = transcript.fetch()
+        
+        # データ形式を確認して標準化（辞書形式に統一）
+        # 形式はすべてのエントリで共通のため最初のエントリだけで判定し、
+        # 形式の混在や欠けた項目があった場合だけエントリごとに確認する
+        transcript_data = list(transcript_data)
+        if transcript_data and isinstance(transcript_data[0], dict):
+            convert = _transcript_entry_from_dict
+        else:
+            convert = _transcript_entry_from_object
+        try:
+            return [convert(entry) for entry in transcript_data]
+        except (KeyError, AttributeError, TypeError):
+            pass
+        
+        standardized_data = []
+        for entry in transcript_data:
+            # 既に辞書形式かチェック
+            if isinstance(entry, dict) and 'start' in entry and 'text' in entry:
+                standardized_data.append(_transcript_entry_from_dict(entry))
+            # オブジェクト形式の場合
+            elif hasattr(entry, 'start') and hasattr(entry, 'text'):
+                standardized_data.append(_transcript_entry_from_object(entry))
+            # その他の場合はスキップ
+            else:
+                print(f"未対応の字幕データ形式です: {type(entry)}")
+        
+        return standardized_data
+        
     def compute_frame_similarity(self, frame1, frame2):
         """2つのフレーム間の類似度を計算する。
 
@@ -330,235 +1137,651 @@ class EnhancedYouTubeTutorialExtractor:
         Returns:
             float: 類似度 (0-1, 1が完全一致)
         """
-        try:
-            # リサイズして計算を高速化
-            small1 = cv2.resize(frame1, (64, 36))
-            small2 = cv2.resize(frame2, (64, 36))
+        return self._gray_similarity(
+            self._to_small_gray(frame1), self._to_small_gray(frame2))
+    
+    def _to_small_gray(self, frame, dst=None):
+        """類似度計算用に縮小したグレースケール画像を作成する。
+
+        Args:
+            frame: BGRフレーム
+            dst: 結果を書き込むグレースケール画像のバッファ（省略時は新しく確保）
             
-            # グレースケールに変換
-            gray1 = cv2.cvtColor(small1, cv2.COLOR_BGR2GRAY)
-            gray2 = cv2.cvtColor(small2, cv2.COLOR_BGR2GRAY)
+        Returns:
+            numpy.ndarray: 縮小済みのグレースケール画像
+        """
+        if self._use_umat:
+            try:
+                # UMat経由でOpenCLデバイスに処理させ、縮小後の小さな画像だけを取り出す
+                small = cv2.resize(cv2.UMat(frame), self._thumb_wh, interpolation=cv2.INTER_AREA)
+                return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).get()
+            except cv2.error as e:
+                print(f"OpenCLでの画像変換に失敗したためCPUで処理します: {e}")
+                self._use_umat = False
+        
+        # 縮小してからグレースケールに変換（INTER_AREAで縮小時のノイズを抑える）
+        # 縮小用のバッファは dst を指定するメインループからの呼び出しでのみ使う
+        # （先読みスレッドからの呼び出しと共有しないため）
+        small = cv2.resize(
+            frame, self._thumb_wh, dst=self._small_buf if dst is not None else None,
+            interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY, dst=dst)
+    
+    def _gray_signature(self, gray):
+        """縮小済みグレースケール画像から画面変化検出用の特徴を求める。
+
+        フレームごとに一度だけ計算し、直前フレームとの比較には特徴だけを使います。
+
+        Args:
+            gray: 縮小済みのグレースケール画像
             
-            # ヒストグラム比較
-            hist1 = cv2.calcHist([gray1], [0], None, [256], [0, 256])
-            hist2 = cv2.calcHist([gray2], [0], None, [256], [0, 256])
+        Returns:
+            知覚ハッシュ (int)、または平均を引いた輝度ヒストグラム (numpy.ndarray)
+        """
+        if self._use_phash:
+            return _phash(gray)
+        hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+        hist -= hist.mean()
+        return hist
+    
+    def _signature_similarity(self, sig1, sig2):
+        """_gray_signature で求めた特徴同士の類似度を計算する。
+
+        Args:
+            sig1: 比較元の特徴
+            sig2: 比較先の特徴
             
-            cv2.normalize(hist1, hist1, 0, 1, cv2.NORM_MINMAX)
-            cv2.normalize(hist2, hist2, 0, 1, cv2.NORM_MINMAX)
+        Returns:
+            float: 類似度 (0-1, 1が完全一致)
+        """
+        try:
+            # 知覚ハッシュの場合はハミング距離（異なるビット数）から類似度を求める
+            if self._use_phash:
+                distance = bin(sig1 ^ sig2).count("1")
+                return 1.0 - distance / 64.0
             
-            # ヒストグラム類似度（コサイン距離）
-            similarity = cv2.compareHist(hist1, hist2, cv2.HISTCMP_CORREL)
+            # 輝度ヒストグラムの相関係数（cv2.compareHist の HISTCMP_CORREL と同じ値）
+            # 小さな画像ではOpenCVの呼び出しごとのオーバーヘッドが大きいためNumPyで計算する
+            denom = np.sqrt((sig1 @ sig1) * (sig2 @ sig2))
+            if denom <= 0:
+                return 1.0  # どちらかのヒストグラムが一定の場合は一致とみなす
+            similarity = float(sig1 @ sig2 / denom)
             
             return max(0, min(1, similarity))  # 0-1の範囲に収める
         except Exception as e:
             print(f"類似度計算エラー: {e}")
             return 1.0  # エラーの場合は変化なしとする
     
-    def extract_frames_advanced(self):
-        """動画からフレームを抽出し、インターバル、テキスト量、画面変化に基づいてフレームを選別する。
+    def _gray_similarity(self, gray1, gray2):
+        """縮小済みグレースケール画像同士の類似度を計算する。
+
+        Args:
+            gray1: 比較元のグレースケール画像
+            gray2: 比較先のグレースケール画像
+            
+        Returns:
+            float: 類似度 (0-1, 1が完全一致)
+        """
+        return self._signature_similarity(
+            self._gray_signature(gray1), self._gray_signature(gray2))
+    
+    def _download_video(self, video_path):
+        """動画全体をダウンロードする（指定フォーマットがなければ緩和したフォーマットを使う）。
+
+        Args:
+            video_path: 保存先の動画ファイルのパス
+            
+        Returns:
+            bool: ダウンロードに成功したかどうか
+        """
+        import yt_dlp
+        
+        # 代替フォーマットは '/' でつないで一度に指定する（yt-dlpが左から順に利用可能な
+        # ものを選ぶため、フォーマットごとに動画情報を取得し直さずに済む）
+        # Whisper APIで動画の音声を使わない場合は、まず音声なしの映像だけを試す
+        # （音声のダウンロードとffmpegによる結合を省ける）
+        fallback_formats = ['best', 'mp4', 'worstvideo+worstaudio/worst']
+        formats = [self.video_format] + [f for f in fallback_formats if f != self.video_format]
+        if not (self.use_whisper and self.whisper_api_key):
+            formats.insert(0, _video_only_format(self.video_format))
+        
+        # yt-dlpの設定オプション
+        ydl_opts = {
+            'format': '/'.join(formats),
+            'outtmpl': video_path,
+            'quiet': True,
+            'no_warnings': True,
+            # DASH/HLSのフラグメントを並列にダウンロードする
+            'concurrent_fragment_downloads': os.cpu_count() or 1,
+        }
+        
+        try:
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                info = self._ydl_extract(ydl)
+            if os.path.exists(video_path):
+                print(f"フォーマット {info.get('format_id', '不明')} でダウンロードしました")
+        except Exception as e:
+            print(f"動画のダウンロードに失敗しました: {e}")
+        
+        return os.path.exists(video_path)
+    
+    def _download_video_sections(self):
+        """各抽出時刻の前後だけを部分的にダウンロードする。
+
+        yt-dlpのdownload_rangesを使い、インターバルごとの短い区間だけを
+        区間ごとのファイルとして保存する。
 
         Returns:
-            tuple: (フレームパスのリスト, フレーム時間のリスト, 対応するテキストのリスト)
+            dict: キーが時間（秒）、値が区間動画ファイルのパスの辞書。
+                失敗時は空の辞書。
         """
         try:
-            print("動画をダウンロード中...")
-            video_path = os.path.join(self.temp_dir, f"{self.video_id}.mp4")
+            import yt_dlp
+            import yt_dlp.utils
+            
+            # 抽出時刻を決めるために動画の長さだけを先に取得（取得済みならそれを使う）
+            info = self._yt_info
+            if info is None:
+                with yt_dlp.YoutubeDL({'skip_download': True, 'quiet': True, 'no_warnings': True}) as ydl:
+                    info = ydl.extract_info(self.url, download=False)
+            duration = int(info.get('duration') or 0)
+            if duration <= 0:
+                return {}
             
-            # yt-dlpの設定オプション（よりロバストな設定）
+            section_times = list(range(0, duration, self.interval))
             ydl_opts = {
-                'format': 'best',  # デフォルトはbestフォーマット
-                'outtmpl': video_path,
+                # 区間動画からはフレームだけを取り出す（Whisper API用の音声は別途ダウンロード）
+                'format': f"{_video_only_format(self.video_format)}/{self.video_format}",
+                'outtmpl': os.path.join(self.temp_dir, f"{self.video_id}_%(section_start)d.mp4"),
+                'download_ranges': yt_dlp.utils.download_range_func(
+                    None, [(sec, sec + 1) for sec in section_times]),
+                'force_keyframes_at_cuts': True,
                 'quiet': True,
                 'no_warnings': True,
             }
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                self._ydl_extract(ydl)
+        except Exception as e:
+            print(f"部分ダウンロードに失敗しました: {e}")
+            return {}
+        
+        sections = {}
+        for sec in section_times:
+            section_path = self._section_path_fmt(sec)
+            if os.path.exists(section_path):
+                sections[sec] = section_path
+        return sections
+    
+    def _download_audio_only(self):
+        """Whisper API用に音声のみをダウンロードする。
+
+        Returns:
+            str: 音声ファイルのパス。失敗時はNone。
+        """
+        try:
+            import yt_dlp
             
-            # 動画のダウンロードを試みる（複数の方法で）
-            success = False
-            
-            # 1. 指定されたフォーマットでダウンロードを試みる
-            if self.video_format != 'best':
-                try:
-                    format_opts = ydl_opts.copy()
-                    format_opts['format'] = self.video_format
-                    with yt_dlp.YoutubeDL(format_opts) as ydl:
-                        ydl.download([self.url])
-                        success = os.path.exists(video_path)
-                        if success:
-                            print("指定されたフォーマットでダウンロードしました")
-                except Exception as e:
-                    print(f"指定フォーマットでのダウンロードに失敗しました: {e}")
-            
-            # 2. 'best' フォーマットでのダウンロードを試みる
-            if not success:
-                try:
-                    print("利用可能な最高品質のフォーマットを使用します...")
-                    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                        ydl.download([self.url])
-                        success = os.path.exists(video_path)
-                        if success:
-                            print("最高品質フォーマットでダウンロードしました")
-                except Exception as e:
-                    print(f"最高品質フォーマットでのダウンロードに失敗しました: {e}")
+            ydl_opts = {
+                'format': 'bestaudio[ext=m4a]/bestaudio',
+                'outtmpl': os.path.join(self.temp_dir, f"{self.video_id}_audio.%(ext)s"),
+                'quiet': True,
+                'no_warnings': True,
+                'concurrent_fragment_downloads': os.cpu_count() or 1,
+            }
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                info = self._ydl_extract(ydl)
+                audio_path = ydl.prepare_filename(info)
             
-            # 3. フォーマット指定をさらに緩和してダウンロードを試みる
-            if not success:
-                try:
-                    print("一般的なフォーマットでダウンロードを試みます...")
-                    alt_opts = ydl_opts.copy()
-                    alt_opts['format'] = 'mp4'
-                    with yt_dlp.YoutubeDL(alt_opts) as ydl:
-                        ydl.download([self.url])
-                        success = os.path.exists(video_path)
-                        if success:
-                            print("mp4フォーマットでダウンロードしました")
-                except Exception as e:
-                    print(f"mp4フォーマットでのダウンロードに失敗しました: {e}")
+            if os.path.exists(audio_path):
+                print("音声のみをダウンロードしました")
+                return audio_path
+            print("音声ファイルが見つかりません")
+        except Exception as e:
+            print(f"音声のダウンロードに失敗しました: {e}")
+        return None
+    
+    def extract_frames_advanced(self):
+        """動画からフレームを抽出し、インターバル、テキスト量、画面変化に基づいてフレームを選別する。
+
+        Returns:
+            tuple: (フレームパスのリスト, フレーム時間のリスト, 対応するテキストのリスト,
+                フレームの (幅, 高さ) のリスト)
+        """
+        cached = self._load_frames_cache()
+        if cached:
+            print(f"キャッシュ済みの抽出結果を使用します: {self.cache_dir}")
+            return cached
+        
+        transcript_pool = None
+        transcript_future = None
+        reader = None
+        try:
+            # Whisper APIで動画の音声を使わない場合、字幕の取得は動画のダウンロードと並行して行う
+            if not (self.use_whisper and self.whisper_api_key):
+                print("字幕をダウンロード中...")
+                transcript_pool = ThreadPoolExecutor(max_workers=1)
+                transcript_future = transcript_pool.submit(self.download_transcript)
             
-            # 4. より簡素なフォーマット指定での最終試行
-            if not success:
-                try:
-                    print("最終試行: シンプルなフォーマットでダウンロードします...")
-                    last_opts = ydl_opts.copy()
-                    last_opts['format'] = 'worstvideo+worstaudio/worst'
-                    with yt_dlp.YoutubeDL(last_opts) as ydl:
-                        ydl.download([self.url])
-                        success = os.path.exists(video_path)
-                        if success:
-                            print("最低品質フォーマットでダウンロードしました")
-                except Exception as e:
-                    print(f"最終試行でのダウンロードにも失敗しました: {e}")
+            print("動画をダウンロード中...")
+            video_path = self._video_path
             
-            if not os.path.exists(video_path):
+            sections = {}
+            if self.sparse_download:
+                sections = self._download_video_sections()
+                if sections:
+                    print(f"{len(sections)} 区間を部分ダウンロードしました")
+                else:
+                    print("部分ダウンロードができなかったため、動画全体をダウンロードします")
+                    
+            if not sections and not self._download_video(video_path):
                 raise Exception("動画のダウンロードに失敗しました")
             
-            print("字幕をダウンロード中...")
-            transcript = self.download_transcript(video_path)
+            if transcript_future is not None:
+                # 受け取った後は finally で改めて待たない
+                transcript_future, fetched = None, transcript_future
+                transcript = fetched.result()
+            else:
+                print("字幕をダウンロード中...")
+                transcript = self.download_transcript(None if sections else video_path)
             if not transcript:
                 print("警告: 字幕を取得できませんでした。テキスト分析に基づくスライド分割は無効になります。")
                 
             print("フレームを抽出中...")
-            cap = cv2.VideoCapture(video_path)
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            duration = total_frames / fps
+            # 各フレームのテキストは時間順に前方へ進めながら字幕から取り出す
+            transcript_cursor = _TranscriptCursor(
+                *self._index_transcript(transcript), window_size=15, compact_text=self.compact_text)
+            if sections:
+                # 部分ダウンロード時は各区間の先頭フレームを使用（区間外へのシークはできない）
+                sampled_frames = self._iter_section_frames(sections)
+            else:
+                # 抽出時刻は常に前方にあるため、シークせずに順に読み進める
+                reader = self._open_frame_reader(video_path)
+                sampled_frames = self._iter_sampled_frames(reader, reader.duration, transcript)
             
             # フレーム情報を記録するための辞書
-            # キー: 時間（秒）、値: (フレームパス, テキスト)
+            # キー: 時間（秒）、値: (フレームパス, テキスト, (幅, 高さ))
             # 辞書を使用することで同一時間のフレームの重複を自動的に排除
             frame_dict = {}
             
-            # 最初のフレームを取得
-            prev_frame = None
+            # 直前のフレームの特徴（フレーム本体や縮小画像は保持しない）
+            self._prev_signature = None
             
-            # インターバルごとにフレームを抽出
-            for sec in range(0, int(duration), self.interval):
-                # 現在の時間ポイントを設定
-                cap.set(cv2.CAP_PROP_POS_MSEC, sec * 1000)
-                ret, frame = cap.read()
+            # デコードは先読みスレッドで、JPEGの書き込みはスレッドプールで行い、
+            # メインスレッドでの画面変化検出と並行させる
+            # （OpenCVのエンコード・書き込み中はGILが解放されるため、コア数まで並列化できる）
+            save_futures = []
+            save_workers = os.cpu_count() or 1
+            with ThreadPoolExecutor(max_workers=save_workers) as save_pool, \
+                    contextlib.closing(_prefetch(sampled_frames)) as prefetched_frames:
+                def submit_save(img_path, frame):
+                    # 未書き込みのフレーム（フル解像度）がメモリに溜まり続けないよう、
+                    # 書き込み待ちがワーカー数の2倍を超えたら古いものの完了を待つ
+                    if len(save_futures) >= save_workers * 2:
+                        save_futures[-save_workers * 2][1].result()
+                    save_futures.append((img_path, save_pool.submit(self._write_jpeg, img_path, frame)))
                 
-                if not ret:
-                    continue
-                
-                # 画面変化検出（最初のフレーム以外）
-                if prev_frame is not None:
-                    similarity = self.compute_frame_similarity(prev_frame, frame)
+                # インターバルごとにフレームを抽出（対象時刻のフレームだけを画像に変換）
+                for sec, frame, text, cut_frames, seg_frames in prefetched_frames:
+                    # 画面変化検出用の縮小画像と特徴は1フレームにつき1回だけ作成する
+                    signature = self._gray_signature(self._to_small_gray(frame, dst=self._gray_buf))
                     
-                    # 類似度が閾値より低い（= 変化が大きい）場合はフレームを追加
-                    if similarity < self.screen_change_threshold:
+                    # インターバルのフレームは画面変化の有無にかかわらず保存するため、
+                    # 保存・テキスト取得は1回にまとめ、画面変化は検出時のログだけに使う
+                    # 既に同じ時間のフレームが存在する場合はスキップ
+                    if sec not in frame_dict:
                         # 画像ファイルとして高品質で保存
-                        timestamp = time.strftime('%H:%M:%S', time.gmtime(sec))
-                        img_path = os.path.join(self.temp_dir, f"frame_{sec}.jpg")
+                        img_path = self._frame_path_fmt(sec)
                         
-                        # 高画質パラメータを設定
-                        img_params = [cv2.IMWRITE_JPEG_QUALITY, self.image_quality]
-                        cv2.imwrite(img_path, frame, img_params)
+                        submit_save(img_path, frame)
                         
-                        # テキスト取得
-                        text = self._get_transcript_at_time(transcript, sec, window_size=15)
+                        # テキスト取得（先読みスレッドで求めていない場合だけここで求める）
+                        if text is None:
+                            text = transcript_cursor.text_at(sec)
                         
-                        # フレーム情報を辞書に追加（重複を避けるため）
-                        if sec not in frame_dict:
-                            frame_dict[sec] = (img_path, text)
-                            print(f"画面変化検出: {sec}秒 (類似度: {similarity:.2f})")
-                
-                # 定期的なインターバルでのフレーム保存（高品質）
-                # 既に同じ時間のフレームが存在する場合はスキップ
-                if sec not in frame_dict:
-                    timestamp = time.strftime('%H:%M:%S', time.gmtime(sec))
-                    img_path = os.path.join(self.temp_dir, f"frame_{sec}.jpg")
-                    
-                    # 高画質パラメータを設定
-                    img_params = [cv2.IMWRITE_JPEG_QUALITY, self.image_quality]
-                    cv2.imwrite(img_path, frame, img_params)
-                    
-                    # テキスト取得
-                    text = self._get_transcript_at_time(transcript, sec, window_size=15)
+                        # フレーム情報を辞書に追加
+                        frame_dict[sec] = (img_path, text, self._saved_frame_size(frame))
+                        
+                        # 画面変化検出（最初のフレーム以外）
+                        # 類似度が閾値より低い（= 変化が大きい）場合
+                        if self._prev_signature is not None:
+                            similarity = self._signature_similarity(self._prev_signature, signature)
+                            if similarity < self.screen_change_threshold:
+                                print(f"画面変化検出: {sec}秒 (類似度: {similarity:.2f})")
                     
-                    # フレーム情報を辞書に追加
-                    frame_dict[sec] = (img_path, text)
-                
-                # テキスト量に基づく分割処理
-                current_time = sec
-                
-                # frame_dictから現在の時間に対応するテキストを取得
-                current_text = frame_dict.get(sec, (None, ""))[1]
-                
-                if transcript and current_text and len(current_text) > self.max_text_length:
-                    # テキスト量が多い場合、セグメントを分割して追加のフレームを作成
-                    segments = self._split_text_by_amount(
-                        transcript, current_time, current_time + self.interval)
+                    # 二分探索で絞り込んだ画面変化直後のフレーム（先読みスレッドで取得済み）
+                    for cut_time, cut_frame in cut_frames:
+                        if cut_time in frame_dict:
+                            continue
+                        
+                        img_path = self._frame_path_fmt(cut_time)
+                        submit_save(img_path, cut_frame)
+                        frame_dict[cut_time] = (
+                            img_path, transcript_cursor.text_at(cut_time),
+                            self._saved_frame_size(cut_frame))
+                        print(f"画面変化位置の絞り込み: {cut_time}秒")
                     
-                    for seg_time in segments[1:]:  # 最初のセグメントは既に追加済み
+                    # テキスト量に基づく分割処理（分割点のフレームは先読みスレッドで取得済み）
+                    for seg_time, seg_frame in seg_frames:
                         # セグメント時間が既に存在する場合はスキップ
                         if seg_time in frame_dict:
                             continue
-                            
-                        # フレームを取得
-                        cap.set(cv2.CAP_PROP_POS_MSEC, seg_time * 1000)
-                        ret, seg_frame = cap.read()
-                        if ret:
-                            # 画像ファイルとして高品質で保存
-                            timestamp = time.strftime('%H:%M:%S', time.gmtime(seg_time))
-                            img_path = os.path.join(self.temp_dir, f"frame_{seg_time}.jpg")
-                            
-                            # 高画質パラメータを設定
-                            img_params = [cv2.IMWRITE_JPEG_QUALITY, self.image_quality]
-                            cv2.imwrite(img_path, seg_frame, img_params)
-                            
-                            # テキスト取得
-                            seg_text = self._get_transcript_at_time(
-                                transcript, seg_time, window_size=15)
-                            
-                            # フレーム情報を辞書に追加
-                            frame_dict[seg_time] = (img_path, seg_text)
-                            print(f"テキスト量による分割: {seg_time}秒")
-                
-                # 現在のフレームを保存
-                prev_frame = frame
+                        
+                        # 画像ファイルとして高品質で保存
+                        img_path = self._frame_path_fmt(seg_time)
+                        
+                        submit_save(img_path, seg_frame)
+                        
+                        # テキスト取得
+                        seg_text = transcript_cursor.text_at(seg_time)
+                        
+                        # フレーム情報を辞書に追加
+                        frame_dict[seg_time] = (
+                            img_path, seg_text, self._saved_frame_size(seg_frame))
+                        print(f"テキスト量による分割: {seg_time}秒")
+                    
+                    # 現在のフレームの特徴を次回の比較用に保持
+                    self._prev_signature = signature
             
-            cap.release()
+            # エンコードしたJPEGデータを保持する（書き込みエラーがあればここで例外として扱う）
+            self._frame_blobs = {path: future.result() for path, future in save_futures}
             
             # 辞書から時間でソートされたリストを作成
             sorted_times = sorted(frame_dict.keys())
             frames = []
             frame_times = []
             transcript_chunks = []
+            frame_sizes = []
             
             for t in sorted_times:
-                img_path, text = frame_dict[t]
+                img_path, text, size = frame_dict[t]
                 frames.append(img_path)
                 frame_times.append(t)
                 transcript_chunks.append(text)
+                frame_sizes.append(size)
             
             print(f"合計 {len(frames)} フレームを抽出しました")
-            return frames, frame_times, transcript_chunks
+            # 字幕を取得できなかった場合（一時的な通信エラーなど）は、次回に取得し直せるよう
+            # 抽出結果をキャッシュしない
+            if transcript:
+                self._save_frames_cache(frames, frame_times, transcript_chunks, frame_sizes)
+            return frames, frame_times, transcript_chunks, frame_sizes
         
         except Exception as e:
             print(f"フレーム抽出に失敗しました: {e}")
             import traceback
             traceback.print_exc()  # スタックトレースを表示
-            return [], [], []
+            return [], [], [], []
+        
+        finally:
+            if reader is not None:
+                reader.close()
+            if transcript_pool is not None:
+                # ダウンロードなどが途中で失敗した場合も字幕の取得の終了を待ち、
+                # 受け取らなかった字幕取得の例外は捨てずに表示する
+                transcript_pool.shutdown(wait=True)
+                if transcript_future is not None and transcript_future.exception() is not None:
+                    print(f"字幕のダウンロードに失敗しました: {transcript_future.exception()}")
 
+    def _saved_frame_size(self, frame):
+        """_write_jpeg で保存されるフレーム画像のサイズを求める。
+
+        Args:
+            frame: BGRフレーム
+            
+        Returns:
+            tuple: (幅, 高さ)
+        """
+        h, w = frame.shape[:2]
+        if self.max_frame_width and w > self.max_frame_width:
+            return self.max_frame_width, int(h * self.max_frame_width / w)
+        return w, h
+    
+    def _write_jpeg(self, path, frame):
+        """フレームをJPEGファイルとして保存する。
+
+        max_frame_width より大きいフレームは縮小してから保存します（保存用のスレッドで
+        縮小するため、メインスレッドの処理は増えません）。
+        libjpeg-turbo（PyTurboJPEG）が使える場合はそちらでエンコードし、
+        使えない場合はOpenCVで保存します。
+
+        Args:
+            path: 保存先のパス
+            frame: BGRフレーム
+            
+        Returns:
+            bytes: JPEGデータ。エンコードに失敗した場合はNone
+        """
+        if self.max_frame_width:
+            frame = self._make_thumbnail(frame, self.max_frame_width)
+        
+        # メモリ上でエンコードし、同じデータをファイルとスライドの作成に使う
+        if self._tj_encode is None:
+            ok, buf = cv2.imencode(".jpg", frame, self._jpeg_params)
+            if not ok:
+                return None
+            blob = buf.tobytes()
+        else:
+            blob = self._tj_encode(frame)
+        
+        with open(path, "wb") as f:
+            f.write(blob)
+        return blob
+    
+    def _frame_blob(self, path):
+        """フレーム画像のJPEGデータを取得する（抽出時にエンコードしたものがあれば読み直さない）。
+
+        Args:
+            path: フレーム画像のパス
+            
+        Returns:
+            bytes: JPEGデータ。読み込めない場合はNone
+        """
+        blob = self._frame_blobs.get(path)
+        return blob if blob is not None else _read_file(path)
+    
+    def _load_frames_cache(self):
+        """キャッシュ済みのフレーム抽出結果を読み込む。
+
+        フレーム画像はキャッシュのディレクトリにあるものをそのまま使います
+        （処理後に削除されるのは一時ディレクトリだけのため、コピーは不要です）。
+
+        Returns:
+            tuple: (フレームパスのリスト, フレーム時間のリスト, 対応するテキストのリスト,
+                フレームの (幅, 高さ) のリスト)。キャッシュがない場合はNone
+        """
+        if not self.use_cache or not _is_cache_fresh(self._cache_manifest_path):
+            return None
+        
+        try:
+            with open(self._cache_manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            # フレームサイズを保存していない古いキャッシュは使わない
+            if "frame_sizes" not in manifest:
+                return None
+            
+            frames = [os.path.join(self.cache_dir, name) for name in manifest["frames"]]
+            if not all(os.path.exists(frame_path) for frame_path in frames):
+                return None
+            frame_sizes = [tuple(size) for size in manifest["frame_sizes"]]
+            return frames, manifest["frame_times"], manifest["transcript_chunks"], frame_sizes
+        except Exception as e:
+            print(f"キャッシュの読み込みに失敗しました: {e}")
+            return None
+    
+    def _save_frames_cache(self, frames, frame_times, transcript_chunks, frame_sizes):
+        """フレーム抽出結果をキャッシュに保存する。
+
+        done.json は最後に書き込むため、途中で中断されたキャッシュは使われません。
+
+        Args:
+            frames: フレームパスのリスト
+            frame_times: フレーム時間のリスト
+            transcript_chunks: 対応するテキストのリスト
+            frame_sizes: フレームの (幅, 高さ) のリスト
+        """
+        if not self.use_cache or not frames:
+            return
+        
+        _evict_expired_cache(self._cache_root)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            names = []
+            for frame_path in frames:
+                name = os.path.basename(frame_path)
+                shutil.copyfile(frame_path, os.path.join(self.cache_dir, name))
+                names.append(name)
+            
+            manifest = {
+                "video_id": self.video_id,
+                "frames": names,
+                "frame_times": frame_times,
+                "transcript_chunks": transcript_chunks,
+                "frame_sizes": frame_sizes,
+            }
+            tmp_path = self._cache_manifest_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False)
+            os.replace(tmp_path, self._cache_manifest_path)
+        except Exception as e:
+            print(f"キャッシュの保存に失敗しました: {e}")
+    
+    def _open_frame_reader(self, video_path):
+        """フレーム読み込み用のリーダーを作成する。
+
+        PyAVがインストールされていればPyAVを、なければOpenCVを使用します。
+
+        Args:
+            video_path: 動画ファイルのパス
+            
+        Returns:
+            _AVFrameReader または _ForwardFrameReader
+        """
+        if _pyav_available():
+            try:
+                return _AVFrameReader(video_path)
+            except Exception as e:
+                print(f"PyAVで動画を開けなかったためOpenCVを使用します: {e}")
+        return _ForwardFrameReader(video_path, hw_decode=self.hw_decode)
+    
+    def _iter_sampled_frames(self, reader, duration, transcript):
+        """インターバルごとの時刻のフレームと、テキスト量による分割点のフレームを順に返す。
+
+        間のフレームは grab() で読み飛ばし、BGR画像への変換は行わない。
+        分割点は字幕だけから決まるため、フレームの読み込みと一緒にここで求める
+        （別スレッドで先読みしても動画の読み込み位置を共有しないで済む）。
+
+        Args:
+            reader: _AVFrameReader または _ForwardFrameReader
+            duration: 動画の長さ（秒）
+            transcript: 字幕データ
+            
+        Yields:
+            tuple: (時間（秒）, BGRフレーム, その時刻の字幕テキスト,
+                [(画面変化直後の時間, BGRフレーム), ...], [(分割点の時間, BGRフレーム), ...])
+        """
+        # 時刻は前方へ進むため、テキストはこのスレッド専用のカーソルで取り出す
+        transcript_cursor = _TranscriptCursor(
+            *self._index_transcript(transcript), window_size=15, compact_text=self.compact_text)
+        prev_sec = None
+        prev_signature = None
+        for sec in range(0, int(duration), self.interval):
+            frame = reader.read_at(sec)
+            if frame is None:
+                continue
+            
+            # 直前のインターバルとの間で画面が変化していれば、変化位置を二分探索で絞り込む
+            cut_frames = []
+            if self.refine_scene_changes:
+                signature = self._gray_signature(self._to_small_gray(frame))
+                if prev_signature is not None:
+                    cut_frames = [
+                        (cut_time, cut_frame)
+                        for cut_time, cut_frame in self._find_cuts(
+                            reader, prev_sec, prev_signature, sec, signature, frame)
+                        if cut_time != sec  # インターバルのフレーム自体は追加済み
+                    ]
+                prev_sec, prev_signature = sec, signature
+            
+            # テキスト量が多い場合、分割点のフレームも続けて読み込む（分割点は次のインターバルより前）
+            seg_frames = []
+            text = transcript_cursor.text_at(sec)
+            if text and len(text) > self.max_text_length:
+                last_time = sec
+                segments = self._split_text_by_amount(transcript, sec, sec + self.interval)
+                for seg_time in segments[1:]:  # 最初のセグメントはインターバルのフレーム
+                    # 同じ時間の分割点は一度だけ読み込む
+                    if seg_time <= last_time:
+                        continue
+                    seg_frame = reader.read_at(seg_time)
+                    if seg_frame is not None:
+                        seg_frames.append((seg_time, seg_frame))
+                        last_time = seg_time
+            yield sec, frame, text, cut_frames, seg_frames
+    
+    def _find_cuts(self, reader, a_sec, sig_a, b_sec, sig_b, frame_b):
+        """2つの時刻の間の画面変化位置を二分探索で求める。
+
+        両端の画面が似ている区間はそれ以上フレームを読み込まずに打ち切ります
+        （スライド中心の動画では画面はほぼ区分的に一定のため、多くの区間は探索不要）。
+
+        Args:
+            reader: _AVFrameReader または _ForwardFrameReader
+            a_sec: 区間の開始時間（秒）
+            sig_a: 開始時刻のフレームの特徴（_gray_signature の結果）
+            b_sec: 区間の終了時間（秒）
+            sig_b: 終了時刻のフレームの特徴
+            frame_b: 終了時刻のBGRフレーム
+            
+        Returns:
+            list: [(画面変化直後の時間, BGRフレーム), ...]
+        """
+        if self._signature_similarity(sig_a, sig_b) >= self.screen_change_threshold:
+            return []
+        if b_sec - a_sec <= _CUT_SEARCH_MIN_GAP:
+            return [(b_sec, frame_b)]
+        
+        mid_sec = (a_sec + b_sec) // 2
+        frame_mid = reader.read_at(mid_sec)
+        if frame_mid is None:
+            return [(b_sec, frame_b)]
+        sig_mid = self._gray_signature(self._to_small_gray(frame_mid))
+        return (self._find_cuts(reader, a_sec, sig_a, mid_sec, sig_mid, frame_mid)
+                + self._find_cuts(reader, mid_sec, sig_mid, b_sec, sig_b, frame_b))
+
+    def _iter_section_frames(self, sections):
+        """部分ダウンロードした区間動画から、各区間の先頭フレームを順に返す。
+
+        Args:
+            sections: キーが時間（秒）、値が区間動画ファイルのパスの辞書
+            
+        Yields:
+            tuple: (時間（秒）, BGRフレーム, None, 空のリスト, 空のリスト)
+                （テキストは呼び出し側で求める。区間外の画面変化位置・分割点は取得できない）
+        """
+        for sec in sorted(sections):
+            cap = cv2.VideoCapture(sections[sec])
+            ret, frame = cap.read()
+            cap.release()
+            if ret:
+                yield sec, frame, None, [], []
+    
+    def _index_transcript(self, transcript):
+        """字幕を時間順に並べ、二分探索用の開始時間リストを作成する。
+
+        同じ字幕に対して繰り返し呼ばれるため、結果は字幕ごとに一度だけ作成して保持します。
+
+        Args:
+            transcript: 字幕データ
+            
+        Returns:
+            tuple: (時間順に並べた字幕データ, 開始時間のリスト)
+        """
+        if self._transcript_index is None or self._transcript_index[0] is not transcript:
+            entries = sorted(transcript, key=lambda x: x['start'])
+            starts = [entry['start'] for entry in entries]
+            self._transcript_index = (transcript, entries, starts)
+        return self._transcript_index[1], self._transcript_index[2]
+    
     def _split_text_by_amount(self, transcript, start_time, end_time):
         """指定時間範囲内の字幕を文字量に基づいて分割し、分割点の時間を返す。
 
@@ -573,31 +1796,26 @@ class EnhancedYouTubeTutorialExtractor:
         if not transcript:
             return [start_time]
             
-        # 時間範囲内の字幕エントリを抽出
-        time_range_entries = [
-            entry for entry in transcript 
-            if start_time <= entry['start'] < end_time
-        ]
+        # 時間範囲内の字幕エントリを二分探索で抽出（時間順に並んだ状態で取り出せる）
+        entries, starts = self._index_transcript(transcript)
+        time_range_entries = entries[
+            bisect.bisect_left(starts, start_time):bisect.bisect_left(starts, end_time)]
         
         if not time_range_entries:
             return [start_time]
-            
-        # 時間順にソート
-        time_range_entries.sort(key=lambda x: x['start'])
         
         # 分割点を格納するリスト（最初の時間点を含む）
         split_points = [start_time]
         
-        # 文字数を累積していく
-        accumulated_text = ""
+        # 文字数（区切りの空白を含む）の累積和を一度だけ計算する
+        cumulative = list(itertools.accumulate(
+            len(entry['text']) + 1 for entry in time_range_entries))
         
-        for entry in time_range_entries:
-            accumulated_text += " " + entry['text']
-            
-            # 文字数が閾値を超えたら分割点として時間を追加
-            if len(accumulated_text) >= self.max_text_length:
-                split_points.append(entry['start'])
-                accumulated_text = ""
+        # 直前の分割点からの文字数が閾値を超える位置を二分探索で求める
+        i = bisect.bisect_left(cumulative, self.max_text_length)
+        while i < len(cumulative):
+            split_points.append(time_range_entries[i]['start'])
+            i = bisect.bisect_left(cumulative, cumulative[i] + self.max_text_length, i + 1)
         
         return split_points
     
@@ -615,50 +1833,40 @@ class EnhancedYouTubeTutorialExtractor:
         if not transcript:
             return ""
             
-        relevant_parts = []
-        last_end_time = -1
+        # 時間順に並べた字幕から、指定時間範囲の付近だけを二分探索で取り出す
+        # （境界の丸め誤差に備えて少し広めに取り、判定は _join_transcript_window で行う）
+        entries, starts = self._index_transcript(transcript)
+        lo = bisect.bisect_left(starts, time_sec - window_size - 1e-6)
+        hi = bisect.bisect_right(starts, time_sec + window_size + 1e-6)
         
-        # 時間順に字幕をソート
-        sorted_transcript = sorted(transcript, key=lambda x: x['start'])
-        
-        for entry in sorted_transcript:
-            start_time = entry['start']
-            
-            # 指定時間範囲内のエントリーを探す
-            if abs(start_time - time_sec) <= window_size:
-                text = entry['text'].strip()
-                if not text:
-                    continue
-                
-                # コンパクトモードの場合、近い時間の字幕をまとめる
-                if self.compact_text and relevant_parts and start_time - last_end_time < 2.0:
-                    # 直前の字幕と結合（改行なし）
-                    relevant_parts[-1] += " " + text
-                else:
-                    relevant_parts.append(text)
-                
-                last_end_time = start_time + entry.get('duration', 0)
-        
-        # スペースで結合（改行なし）
-        return " ".join(relevant_parts) if self.compact_text else "\n".join(relevant_parts)
+        return _join_transcript_window(entries[lo:hi], time_sec, window_size, self.compact_text)
     
     def create_google_slides(self, frames_data, video_info):
         """GoogleSlides用プレゼンテーション（PPTX形式）を作成する。
 
         Args:
-            frames_data: フレームデータのタプル (フレームパス, 時間, テキスト)
+            frames_data: フレームデータのタプル (フレームパス, 時間, テキスト, (幅, 高さ))
             video_info: 動画情報の辞書
             
         Returns:
             str: 作成したPPTXファイルのパス
         """
         try:
-            frames, frame_times, transcript_chunks = frames_data
+            from pptx import Presentation
+            from pptx.dml.color import RGBColor
+            from pptx.util import Inches, Pt
             
-            prs = Presentation()
+            frames, frame_times, transcript_chunks, frame_sizes = frames_data
+            # 目次とスライドの両方で使うタイムスタンプは一度だけ作成する
+            timestamps = [_fmt_hms(frame_time) for frame_time in frame_times]
+            
+            # 既定のテンプレートはプロセス内で一度だけ読み込み、メモリ上から開く
+            prs = Presentation(io.BytesIO(_pptx_template_bytes()))
+            # すべてのスライドで使う空白レイアウトは一度だけ取り出す
+            blank_layout = prs.slide_layouts[6]
             
             # タイトルスライド - 空白レイアウトを使用して完全に手動で構成
-            title_slide = prs.slides.add_slide(prs.slide_layouts[6])  # 空白レイアウト
+            title_slide = prs.slides.add_slide(blank_layout)
             
             # サムネイル画像の追加（利用可能かつオプションが有効な場合）
             thumbnail_height = 0
@@ -669,19 +1877,14 @@ class EnhancedYouTubeTutorialExtractor:
                     thumbnail_top = Inches(0.5)
                     thumbnail_left = (prs.slide_width - thumbnail_width) / 2  # 中央揃え
                     
-                    # サムネイルの高さを計算
-                    img = Image.open(video_info["thumbnail_path"])
-                    img_width, img_height = img.size
-                    aspect_ratio = img_height / img_width
-                    thumbnail_height = thumbnail_width * aspect_ratio
-                    
-                    # サムネイルを追加
+                    # サムネイルを追加（高さは縦横比を保つようpython-pptxが画像のヘッダーから求める）
                     thumbnail = title_slide.shapes.add_picture(
                         video_info["thumbnail_path"], 
                         thumbnail_left, 
                         thumbnail_top, 
                         width=thumbnail_width
                     )
+                    thumbnail_height = thumbnail.height
                     print(f"サムネイル画像を追加しました")
                 except Exception as e:
                     print(f"サムネイル画像の追加に失敗しました: {e}")
@@ -738,7 +1941,7 @@ class EnhancedYouTubeTutorialExtractor:
             p.alignment = 1  # 中央揃え
             
             # 目次スライド - 空白レイアウトを使用して完全に手動で構成
-            toc_slide = prs.slides.add_slide(prs.slide_layouts[6])  # 空白レイアウト
+            toc_slide = prs.slides.add_slide(blank_layout)
             
             # 目次タイトルをテキストボックスとして追加
             left = Inches(0.5)
@@ -767,7 +1970,7 @@ class EnhancedYouTubeTutorialExtractor:
             # 目次項目を追加
             if frame_times and len(frame_times) > 0:
                 # 最初の目次項目
-                timestamp = time.strftime('%H:%M:%S', time.gmtime(frame_times[0]))
+                timestamp = timestamps[0]
                 preview = transcript_chunks[0][:30] + "..." if transcript_chunks[0] and len(transcript_chunks[0]) > 30 else transcript_chunks[0] or "..."
                 
                 p = tf.add_paragraph()
@@ -778,7 +1981,7 @@ class EnhancedYouTubeTutorialExtractor:
                 
                 # 残りの目次項目を追加
                 for i in range(1, len(frame_times)):
-                    timestamp = time.strftime('%H:%M:%S', time.gmtime(frame_times[i]))
+                    timestamp = timestamps[i]
                     preview = transcript_chunks[i][:30] + "..." if transcript_chunks[i] and len(transcript_chunks[i]) > 30 else transcript_chunks[i] or "..."
                     
                     p = tf.add_paragraph()
@@ -792,104 +1995,83 @@ class EnhancedYouTubeTutorialExtractor:
                 p.font.size = Pt(14)
             
             # コンテンツスライド - 空白レイアウトを使用
-            for i, (frame_path, frame_time, transcript_text) in enumerate(
-                    zip(frames, frame_times, transcript_chunks)):
-                # 空白のスライドを追加
-                slide = prs.slides.add_slide(prs.slide_layouts[6])  # 空白レイアウト
-                timestamp = time.strftime('%H:%M:%S', time.gmtime(frame_time))
-                
-                # タイトルをテキストボックスとして手動で追加（上部に配置）
-                left = Inches(0.5)
-                top = Inches(0.1)  # 位置を上に移動
-                width = prs.slide_width - Inches(1.0)
-                height = Inches(0.5)
-                
-                title_box = slide.shapes.add_textbox(left, top, width, height)
-                tf = title_box.text_frame
-                p = tf.add_paragraph()
-                p.text = f"セクション {i+1} - {timestamp}"
-                p.font.size = Pt(20)
-                p.font.bold = True
-                p.alignment = 1  # 中央揃え
-                
-                # フレーム画像（スライドの80%のサイズ）
-                img_height = Inches(3.0)  # デフォルト値
-                if os.path.exists(frame_path):
-                    try:
-                        # スライドのサイズを取得
-                        slide_width = prs.slide_width
-                        slide_height = prs.slide_height
-                        
-                        # スライドの画質向上のため、解像度を考慮した適切なサイズ比率を計算
+            # 抽出時にエンコードしたJPEGデータはそのまま使い、キャッシュから読み込んだ場合など
+            # ファイルの読み込みが必要な場合は先読みスレッドで行い、スライドの作成と並行させる
+            # （python-pptxの操作はメインスレッドだけで行う）
+            # スライドごとに変わらないレイアウト・位置・サイズ・フォントは一度だけ求める
+            slide_width = prs.slide_width
+            slide_height = prs.slide_height
+            box_left = Inches(0.5)
+            box_width = slide_width - Inches(1.0)
+            title_top = Inches(0.1)  # 位置を上に移動
+            title_height = Inches(0.5)
+            title_font_size = Pt(20)
+            text_height = Inches(1.5)
+            text_font_size = Pt(14)
+            link_left, link_top = Inches(0.5), Inches(6.8)
+            link_width, link_height = Inches(9), Inches(0.4)
+            link_font_size = Pt(10)
+            link_color = RGBColor(0, 0, 255)
+            default_img_height = Inches(3.0)
+            img_top = Inches(0.7)  # タイトルとの間隔を適切に設定
+            text_margin = Inches(0.8) + Inches(0.2)  # 画像とテキストの間の余白
+            picture_layouts = {}  # フレームのサイズごとの画像の配置 (左端, 幅)
+            with contextlib.closing(_prefetch(map(self._frame_blob, frames), maxsize=8)) as frame_blobs:
+                for i, (frame_time, transcript_text, frame_size, image_blob) in enumerate(
+                        zip(frame_times, transcript_chunks, frame_sizes, frame_blobs)):
+                    # 空白のスライドを追加
+                    slide = prs.slides.add_slide(blank_layout)
+                    timestamp = timestamps[i]
+                    
+                    # タイトルをテキストボックスとして手動で追加（上部に配置）
+                    title_box = slide.shapes.add_textbox(box_left, title_top, box_width, title_height)
+                    p = title_box.text_frame.add_paragraph()
+                    p.text = f"セクション {i+1} - {timestamp}"
+                    p.font.size = title_font_size
+                    p.font.bold = True
+                    p.alignment = 1  # 中央揃え
+                    
+                    # フレーム画像（スライドの80%のサイズ）
+                    img_height = default_img_height  # デフォルト値
+                    if image_blob is not None:
                         try:
-                            # 画像ファイルを読み込む
-                            image = cv2.imread(frame_path)
-                            if image is not None:
-                                frame_height, frame_width = image.shape[:2]
-                                slide_aspect_ratio = 16/9  # スライドのアスペクト比（標準的なワイドスクリーン）
-                                
-                                # アスペクト比を考慮して配置する画像の幅を決定
-                                if frame_width/frame_height > slide_aspect_ratio:
-                                    # 横長の画像の場合、幅を基準に調整（横幅の80%に拡大）
-                                    img_width = int(slide_width * 0.8)
-                                    img_height = int(img_width * frame_height / frame_width)
-                                else:
-                                    # 縦長または正方形の画像の場合、高さを基準に調整（高さの60%に拡大）
-                                    img_height = int(slide_height * 0.6)
-                                    img_width = int(img_height * frame_width / frame_height)
-                                    # 幅が横幅の80%を超える場合は調整
-                                    if img_width > int(slide_width * 0.8):
-                                        img_width = int(slide_width * 0.8)
-                                        img_height = int(img_width * frame_height / frame_width)
-                            else:
-                                # 画像が読み込めない場合はデフォルト値を使用
-                                img_width = int(slide_width * 0.8)
-                                img_height = int(slide_height * 0.5)
+                            # 同じ動画のフレームはほぼすべて同じサイズのため、配置はサイズごとに一度だけ求める
+                            # （フレームのサイズは抽出時に記録したものを使い、画像は読み込まない）
+                            picture_layout = picture_layouts.get(frame_size)
+                            if picture_layout is None:
+                                picture_layout = picture_layouts[frame_size] = _picture_layout(
+                                    frame_size, slide_width, slide_height)
+                            img_left, img_width = picture_layout
+                            
+                            pic = slide.shapes.add_picture(
+                                io.BytesIO(image_blob), img_left, img_top, width=img_width)
+                            
+                            # 画像の高さを取得
+                            img_height = pic.height
                         except Exception as e:
-                            print(f"画像サイズ計算エラー: {e}")
-                            # エラー時はデフォルト値を使用
-                            img_width = int(slide_width * 0.8)  # 横幅の80%に拡大
-                            img_height = int(slide_height * 0.6)
-                        
-                        # 画像を適切な位置に配置
-                        img_left = int((slide_width - img_width) / 2)
-                        img_top = Inches(0.7)  # タイトルとの間隔を適切に設定
-                        
-                        pic = slide.shapes.add_picture(frame_path, img_left, img_top, width=img_width)
-                        
-                        # 画像の高さを取得
-                        img_height = pic.height
-                    except Exception as e:
-                        print(f"画像の追加に失敗しました: {e}")
-                        # img_heightはデフォルト値のままにする
-                        
-                # トランスクリプトテキスト（画像の後ろにかからないように下部に配置）
-                if transcript_text:
-                    left = Inches(0.5)
-                    text_top = Inches(0.8) + img_height + Inches(0.2)  # 画像の下に余白を設けて配置
-                    width = prs.slide_width - Inches(1.0)
-                    height = Inches(1.5)
+                            print(f"画像の追加に失敗しました: {e}")
+                            # img_heightはデフォルト値のままにする
                     
-                    text_box = slide.shapes.add_textbox(left, text_top, width, height)
-                    tf = text_box.text_frame
-                    tf.word_wrap = True
-                    p = tf.add_paragraph()
-                    p.text = transcript_text
-                    p.font.size = Pt(14)
-                
-                # YouTube リンク（スライドの最下部に配置、クリック可能なハイパーリンクとして）
-                youtube_link = f"{self.url}&t={int(frame_time)}s"
-                link_box = slide.shapes.add_textbox(Inches(0.5), Inches(6.8), Inches(9), Inches(0.4))
-                tf = link_box.text_frame
-                p = tf.add_paragraph()
-                run = p.add_run()
-                run.text = "この部分を動画で見る"
-                run.font.size = Pt(10)
-                run.font.color.rgb = RGBColor(0, 0, 255)
-                run.hyperlink.address = youtube_link
-            
+                    # トランスクリプトテキスト（画像の後ろにかからないように下部に配置）
+                    if transcript_text:
+                        text_top = img_height + text_margin  # 画像の下に余白を設けて配置
+                        text_box = slide.shapes.add_textbox(box_left, text_top, box_width, text_height)
+                        tf = text_box.text_frame
+                        tf.word_wrap = True
+                        p = tf.add_paragraph()
+                        p.text = transcript_text
+                        p.font.size = text_font_size
+                    
+                    # YouTube リンク（スライドの最下部に配置、クリック可能なハイパーリンクとして）
+                    link_box = slide.shapes.add_textbox(link_left, link_top, link_width, link_height)
+                    run = link_box.text_frame.add_paragraph().add_run()
+                    run.text = "この部分を動画で見る"
+                    run.font.size = link_font_size
+                    run.font.color.rgb = link_color
+                    run.hyperlink.address = f"{self.url}&t={int(frame_time)}s"
+
             # PPTXを保存（GoogleSlides用）
-            safe_title = ''.join(c for c in video_info["title"] if c.isalnum() or c.isspace() or c == '_')[:30]
+            safe_title = _UNSAFE_TITLE_CHARS_RE.sub("", video_info["title"])[:30]
             pptx_path = os.path.join(self.output_dir, f"{safe_title}_googleslides.pptx")
             prs.save(pptx_path)
             print(f"GoogleSlides用ファイルを作成しました: {pptx_path}")
@@ -928,12 +2110,9 @@ class EnhancedYouTubeTutorialExtractor:
         # GoogleSlides形式でスライドを生成
         result_path = self.create_google_slides(frames_data, video_info)
         
-        # 一時ファイルを削除
-        for frame_path in frames_data[0]:
-            if os.path.exists(frame_path):
-                os.remove(frame_path)
-        
-        if os.path.exists(os.path.join(self.temp_dir, f"{self.video_id}.mp4")):
-            os.remove(os.path.join(self.temp_dir, f"{self.video_id}.mp4"))
+        # 一時ファイル（フレーム画像・動画・区間動画・音声・サムネイル）をディレクトリごと削除
+        # （一時ディレクトリはこのインスタンスの処理専用のため個別に確認しない）
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        self._frame_blobs = {}
         
         return result_path
\ No newline at end of file
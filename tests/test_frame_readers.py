@@ -0,0 +1,67 @@
+"""_ForwardFrameReader・_AVFrameReader のシークと順読みの結果が一致することのテスト。"""
+
+import cv2
+import numpy as np
+import pytest
+
+import enhanced_youtube_extractor as eye
+
+FPS = 10
+DURATION = 40  # 秒（SEEK_MIN_GAP より長い移動を含められる長さ）
+
+
+def _level(sec):
+    """各秒のフレームの輝度（秒ごとに変わり、圧縮しても区別できる値）。"""
+    return 20 * (sec % 12) + 10
+
+
+@pytest.fixture(scope="module")
+def video_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("video") / "clip.mp4")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), FPS, (64, 48))
+    if not writer.isOpened():
+        pytest.skip("mp4v でテスト用の動画を書き出せません")
+    for index in range(DURATION * FPS):
+        writer.write(np.full((48, 64, 3), _level(index // FPS), np.uint8))
+    writer.release()
+    return path
+
+
+def _readers():
+    readers = [eye._ForwardFrameReader]
+    if eye._pyav_available():
+        readers.append(eye._AVFrameReader)
+    return readers
+
+
+def _read_all(reader_cls, path, times):
+    reader = reader_cls(path)
+    try:
+        return [reader.read_at(sec) for sec in times]
+    finally:
+        reader.close()
+
+
+@pytest.mark.parametrize("reader_cls", _readers())
+def test_forward_scan_reads_the_requested_second(video_path, reader_cls):
+    times = list(range(0, DURATION, 3))
+    for sec, frame in zip(times, _read_all(reader_cls, video_path, times)):
+        assert frame is not None
+        assert abs(float(frame.mean()) - _level(sec)) < 4
+
+
+@pytest.mark.parametrize("reader_cls", _readers())
+def test_seek_matches_forward_scan(video_path, reader_cls):
+    # 遠く先へ進む移動と前に戻る移動でシークさせ、順読みで得たフレームと比較する
+    seek_times = [1, 25, 37, 4, 18, 2, 33]
+    assert max(b - a for a, b in zip(seek_times, seek_times[1:])) > reader_cls.SEEK_MIN_GAP
+    
+    sequential = dict(zip(sorted(seek_times), _read_all(reader_cls, video_path, sorted(seek_times))))
+    for sec, frame in zip(seek_times, _read_all(reader_cls, video_path, seek_times)):
+        assert frame is not None
+        assert np.array_equal(frame, sequential[sec]), sec
+
+
+@pytest.mark.parametrize("reader_cls", _readers())
+def test_read_past_the_end_returns_none(video_path, reader_cls):
+    assert _read_all(reader_cls, video_path, [DURATION + 5]) == [None]
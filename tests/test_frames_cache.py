@@ -0,0 +1,125 @@
+"""フレーム抽出結果のキャッシュ（キー・保存と読み込み・期限切れの削除）のテスト。"""
+
+import json
+import os
+import time
+
+import pytest
+
+import enhanced_youtube_extractor as eye
+from enhanced_youtube_extractor import EnhancedYouTubeTutorialExtractor
+
+VIDEO_ID = "dQw4w9WgXcQ"
+
+
+def _make_extractor(output_dir, **kwargs):
+    return EnhancedYouTubeTutorialExtractor(VIDEO_ID, output_dir=str(output_dir), **kwargs)
+
+
+def _write_frames(extractor, times):
+    paths = []
+    for sec in times:
+        path = extractor._frame_path_fmt(sec)
+        with open(path, "wb") as f:
+            f.write(f"frame {sec}".encode())
+        paths.append(path)
+    return paths
+
+
+def _age(path, seconds):
+    old = time.time() - seconds
+    os.utime(path, (old, old))
+
+
+def test_cache_key_depends_on_extraction_settings(tmp_path):
+    base = _make_extractor(tmp_path)
+    assert _make_extractor(tmp_path)._cache_key == base._cache_key
+    assert _make_extractor(tmp_path, interval=60)._cache_key != base._cache_key
+    assert _make_extractor(tmp_path, similarity_method="phash")._cache_key != base._cache_key
+    assert _make_extractor(tmp_path, video_format="best")._cache_key != base._cache_key
+
+
+def test_frames_cache_round_trip(tmp_path):
+    extractor = _make_extractor(tmp_path)
+    frames = _write_frames(extractor, [0, 30])
+    extractor._save_frames_cache(frames, [0, 30], ["a", "b"], [(640, 360), (640, 360)])
+    
+    cached = _make_extractor(tmp_path)._load_frames_cache()
+    assert cached is not None
+    cached_frames, frame_times, chunks, sizes = cached
+    assert [os.path.dirname(path) for path in cached_frames] == [extractor.cache_dir] * 2
+    with open(cached_frames[1], "rb") as f:
+        assert f.read() == b"frame 30"
+    assert frame_times == [0, 30]
+    assert chunks == ["a", "b"]
+    assert sizes == [(640, 360), (640, 360)]
+
+
+def test_frames_cache_disabled(tmp_path):
+    extractor = _make_extractor(tmp_path, use_cache=False)
+    frames = _write_frames(extractor, [0])
+    extractor._save_frames_cache(frames, [0], ["a"], [(640, 360)])
+    assert not os.path.exists(extractor.cache_dir)
+    assert extractor._load_frames_cache() is None
+
+
+def test_frames_cache_ignores_missing_frame(tmp_path):
+    extractor = _make_extractor(tmp_path)
+    frames = _write_frames(extractor, [0, 30])
+    extractor._save_frames_cache(frames, [0, 30], ["a", "b"], [(640, 360), (640, 360)])
+    os.remove(os.path.join(extractor.cache_dir, os.path.basename(frames[0])))
+    assert extractor._load_frames_cache() is None
+
+
+def test_expired_frames_cache_is_not_used(tmp_path):
+    extractor = _make_extractor(tmp_path)
+    frames = _write_frames(extractor, [0])
+    extractor._save_frames_cache(frames, [0], ["a"], [(640, 360)])
+    _age(extractor._cache_manifest_path, eye._CACHE_MAX_AGE + 60)
+    assert extractor._load_frames_cache() is None
+
+
+def test_evict_expired_cache(tmp_path):
+    cache_root = tmp_path / ".cache"
+    stale_dir = cache_root / "stale"
+    fresh_dir = cache_root / "fresh"
+    for directory in (stale_dir, fresh_dir):
+        directory.mkdir(parents=True)
+        (directory / "done.json").write_text(json.dumps({}))
+    stale_file = cache_root / "old.json.gz"
+    fresh_file = cache_root / "new.json.gz"
+    stale_file.write_bytes(b"")
+    fresh_file.write_bytes(b"")
+    
+    expired = eye._CACHE_MAX_AGE + 60
+    _age(stale_dir / "done.json", expired)
+    _age(stale_dir, expired)
+    _age(stale_file, expired)
+    
+    eye._evict_expired_cache(str(cache_root))
+    
+    assert sorted(os.listdir(cache_root)) == ["fresh", "new.json.gz"]
+
+
+def test_evict_expired_cache_without_cache_root(tmp_path):
+    # キャッシュのディレクトリがまだない場合も例外にならない
+    eye._evict_expired_cache(str(tmp_path / "missing"))
+
+
+@pytest.mark.parametrize("url", [
+    VIDEO_ID,
+    f"https://youtu.be/{VIDEO_ID}",
+    f"https://www.youtube.com/shorts/{VIDEO_ID}",
+    f"https://www.youtube.com/embed/{VIDEO_ID}",
+])
+def test_url_is_normalised(tmp_path, url):
+    extractor = EnhancedYouTubeTutorialExtractor(url, output_dir=str(tmp_path))
+    assert extractor.url == f"https://www.youtube.com/watch?v={VIDEO_ID}"
+
+
+def test_each_extractor_has_its_own_temp_dir(tmp_path):
+    first = _make_extractor(tmp_path)
+    frames = _write_frames(first, [0])
+    second = _make_extractor(tmp_path)
+    assert second.temp_dir != first.temp_dir
+    assert os.path.exists(frames[0])
@@ -0,0 +1,97 @@
+"""WhisperTranscriptionProvider の音声分割の失敗時と、APIの再送のテスト。"""
+
+import subprocess
+
+import pytest
+
+import whisper_integration
+from whisper_integration import WhisperTranscriptionProvider
+
+
+class _Response:
+    def __init__(self, status_code, payload=None, headers=None):
+        self.status_code = status_code
+        self._payload = payload or {}
+        self.headers = headers or {}
+        self.text = ""
+
+    def json(self):
+        return self._payload
+
+
+class _Session:
+    """post の呼び出しを記録し、用意したレスポンスを順に返すセッション。"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def post(self, url, files=None, data=None):
+        self.calls += 1
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def provider():
+    return WhisperTranscriptionProvider("test-key", language="ja")
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    waits = []
+    monkeypatch.setattr(whisper_integration.time, "sleep", waits.append)
+    return waits
+
+
+@pytest.fixture
+def segment_path(tmp_path):
+    path = tmp_path / "segment_000.ogg"
+    path.write_bytes(b"audio")
+    return str(path)
+
+
+def test_split_audio_failure_returns_empty_list(provider, tmp_path, monkeypatch):
+    def fail(*args, **kwargs):
+        raise subprocess.CalledProcessError(1, args[0])
+    
+    monkeypatch.setattr(whisper_integration.subprocess, "run", fail)
+    assert provider._split_audio(str(tmp_path / "video.mp4"), str(tmp_path)) == []
+
+
+def test_transcribe_audio_uploads_nothing_when_split_fails(provider, tmp_path, monkeypatch):
+    monkeypatch.setattr(provider, "_split_audio", lambda *args, **kwargs: [])
+    provider.session = _Session([])
+    assert provider.transcribe_audio(str(tmp_path / "video.mp4")) == []
+    assert provider.session.calls == 0
+
+
+def test_transcribe_segment_retries_rate_limits_and_server_errors(provider, segment_path, sleeps):
+    provider.session = _Session([
+        _Response(429, headers={"Retry-After": "7"}),
+        _Response(503),
+        _Response(200, {"segments": [{"start": 1.0, "end": 3.5, "text": " こんにちは "}]}),
+    ])
+    
+    result = provider._transcribe_segment(segment_path, offset=300.0)
+    
+    assert provider.session.calls == 3
+    # Retry-After があればその時間、なければ指数的に延ばした時間だけ待つ
+    assert sleeps == [7.0, 2.0]
+    assert result == [{"start": 301.0, "text": "こんにちは", "duration": 2.5}]
+
+
+def test_transcribe_segment_gives_up_after_max_retries(provider, segment_path, sleeps):
+    attempts = provider.MAX_RETRIES + 1
+    provider.session = _Session([_Response(500)] * attempts)
+    
+    assert provider._transcribe_segment(segment_path, offset=0.0) == []
+    assert provider.session.calls == attempts
+    assert len(sleeps) == provider.MAX_RETRIES
+
+
+def test_transcribe_segment_does_not_retry_client_errors(provider, segment_path, sleeps):
+    provider.session = _Session([_Response(400)])
+    
+    assert provider._transcribe_segment(segment_path, offset=0.0) == []
+    assert provider.session.calls == 1
+    assert sleeps == []
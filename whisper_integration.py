@@ -4,17 +4,26 @@
 より高精度な字幕を生成します。
 """
 
+import csv
 import os
 import tempfile
 import subprocess
 import time
 import requests
-from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 
 
 class WhisperTranscriptionProvider:
     """Whisper APIを利用して音声から字幕を生成するクラス。"""
     
+    # 音声を分割する長さ（秒）と、同時に送信するリクエスト数
+    SEGMENT_LENGTH = 300
+    MAX_WORKERS = 6
+    # レート制限（HTTP 429）や一時的なサーバーエラーの際に再送する回数
+    MAX_RETRIES = 3
+    RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+    
     def __init__(self, api_key: str, language: str = "ja", model: str = "medium"):
         """初期化メソッド。
         
@@ -27,6 +36,11 @@ class WhisperTranscriptionProvider:
         self.language = language
         self.model = model  # 現在はUIの互換性のために保持
         self.api_url = "https://api.openai.com/v1/audio/transcriptions"
+        # セグメント間でHTTPS接続を使い回す（並行送信する数だけ接続を保持）
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=self.MAX_WORKERS)
+        self.session.mount("https://", adapter)
+        self.session.headers["Authorization"] = f"Bearer {api_key}"
         
     def extract_audio(self, video_path: str, output_dir: str) -> Optional[str]:
         """動画から音声を抽出する。
@@ -45,11 +59,12 @@ class WhisperTranscriptionProvider:
         # FFmpegを使用して音声を抽出
         try:
             command = [
-                "ffmpeg", "-i", video_path, 
+                "ffmpeg", "-hide_banner", "-loglevel", "error", "-i", video_path, 
                 "-q:a", "0", "-map", "a", "-vn", 
                 audio_path
             ]
-            subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            # 進捗表示はエラー時以外出力させず、使わない標準出力は受け取らない
+            subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
             return audio_path
         except subprocess.CalledProcessError as e:
             print(f"音声抽出エラー: {e}")
@@ -58,177 +73,164 @@ class WhisperTranscriptionProvider:
             print(f"予期しないエラー: {e}")
             return None
             
-    def _split_audio(self, audio_path: str, output_dir: str, segment_length: int = 600) -> List[str]:
+    def _split_audio(self, audio_path: str, output_dir: str,
+                     segment_length: int = SEGMENT_LENGTH) -> List[Tuple[str, float]]:
         """音声ファイルを指定された長さのセグメントに分割する。
         
+        ffmpegのsegmentマルチプレクサを使い、1回の実行で音声全体を分割します。
+        各セグメントは32kbpsのOpus（1分あたり約0.25MB）に変換するため、
+        APIのファイルサイズ制限（25MB）を十分に下回ります。
+        
         Args:
-            audio_path: 音声ファイルのパス
+            audio_path: 音声ファイル（または動画ファイル。最初の音声トラックを使用）のパス
             output_dir: 出力ディレクトリ
             segment_length: セグメントの長さ（秒）
             
         Returns:
-            List[str]: 分割された音声ファイルのパスリスト
+            List[Tuple[str, float]]: 分割された音声ファイルのパスと開始時間（秒）のリスト。
+                失敗時は空のリスト（元のファイルは動画の場合もあり、APIの制限を超えるため送信しない）
         """
-        # 音声の長さを取得
-        try:
-            command = ["ffprobe", "-v", "error", "-show_entries", "format=duration", 
-                      "-of", "default=noprint_wrappers=1:nokey=1", audio_path]
-            result = subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            duration = float(result.stdout)
-        except Exception as e:
-            print(f"音声の長さを取得できませんでした: {e}")
-            return [audio_path]  # 分割せずに元のファイルを返す
-            
-        # セグメント数を計算
-        num_segments = int(duration / segment_length) + 1
-        segment_files = []
-        
-        # 音声を分割
         base_name = os.path.splitext(os.path.basename(audio_path))[0]
+        segment_pattern = os.path.join(output_dir, f"{base_name}_segment_%03d.ogg")
+        # 各セグメントのファイル名と開始時間はCSV形式の一覧に書き出させる
+        segment_list = os.path.join(output_dir, f"{base_name}_segments.csv")
         
-        for i in range(num_segments):
-            start_time = i * segment_length
-            segment_file = os.path.join(output_dir, f"{base_name}_segment_{i:03d}.mp3")
+        try:
+            command = [
+                "ffmpeg", "-hide_banner", "-loglevel", "error", "-i", audio_path,
+                "-map", "0:a:0", "-c:a", "libopus", "-b:a", "32k",
+                "-f", "segment", "-segment_time", str(segment_length),
+                "-reset_timestamps", "1",
+                "-segment_list", segment_list, "-segment_list_type", "csv",
+                segment_pattern
+            ]
+            subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
             
-            try:
-                command = [
-                    "ffmpeg", "-i", audio_path, 
-                    "-ss", str(start_time), 
-                    "-t", str(segment_length),
-                    "-c:a", "libmp3lame", "-q:a", "4", 
-                    segment_file
-                ]
-                subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                segment_files.append(segment_file)
-            except Exception as e:
-                print(f"セグメント {i} の分割に失敗しました: {e}")
-                
+            segment_files = []
+            with open(segment_list, encoding="utf-8", newline="") as f:
+                for name, start, _ in csv.reader(f):
+                    segment_files.append((os.path.join(output_dir, name), float(start)))
+            os.remove(segment_list)
+        except Exception as e:
+            print(f"音声の分割に失敗しました: {e}")
+            return []
+        
         return segment_files
-            
-    def transcribe_audio(self, audio_path: str) -> List[Dict[str, Any]]:
-        """Whisper APIを使用して音声を文字起こしする。
+    
+    def _transcribe_segment(self, segment_path: str, offset: float) -> List[Dict[str, Any]]:
+        """1つの音声セグメントをWhisper APIで文字起こしする。
         
         Args:
-            audio_path: 音声ファイルのパス
+            segment_path: 音声ファイルのパス
+            offset: セグメントの動画内での開始時間（秒）
             
         Returns:
-            List[Dict[str, Any]]: 文字起こし結果（YouTube-Transcript-APIと互換性のある形式）
+            List[Dict[str, Any]]: 文字起こし結果（開始時間は動画全体での時間）
         """
-        # 音声ファイルが大きい場合は分割（WhisperAPIの制限は25MB）
-        # ファイルサイズを確認
-        file_size = os.path.getsize(audio_path) / (1024 * 1024)  # MB単位
-        
-        if file_size > 24:
-            print(f"音声ファイルが大きいため分割します（{file_size:.2f}MB）")
-            temp_dir = tempfile.mkdtemp()
-            audio_segments = self._split_audio(audio_path, temp_dir)
-        else:
-            audio_segments = [audio_path]
-            
-        all_transcripts = []
-        current_start_time = 0.0
-        
         # 現在のOpenAI APIではすべてwhisper-1モデルを使用
         api_model = "whisper-1"
         
-        # 各セグメントを文字起こし
-        for segment_path in audio_segments:
-            try:
-                headers = {
-                    "Authorization": f"Bearer {self.api_key}"
-                }
-                
+        try:
+            data = {
+                "model": api_model,  # 常に "whisper-1" を使用
+                "language": self.language,
+                "response_format": "verbose_json",
+                "timestamp_granularities": ["segment"]
+            }
+            
+            for attempt in range(self.MAX_RETRIES + 1):
                 with open(segment_path, "rb") as audio_file:
                     files = {
                         "file": audio_file,
                     }
-                    data = {
-                        "model": api_model,  # 常に "whisper-1" を使用
-                        "language": self.language,
-                        "response_format": "verbose_json",
-                        "timestamp_granularities": ["segment"]
-                    }
                     
                     # APIリクエスト
-                    response = requests.post(
+                    response = self.session.post(
                         self.api_url,
-                        headers=headers,
                         files=files,
                         data=data
                     )
-                    
-                    if response.status_code != 200:
-                        print(f"API エラー: {response.status_code}")
-                        print(response.text)
-                        continue
-                        
-                    result = response.json()
-                    
-                    # セグメントごとの結果を変換
-                    if "segments" in result:
-                        for segment in result["segments"]:
-                            transcript_entry = {
-                                "start": current_start_time + segment.get("start", 0),
-                                "text": segment.get("text", "").strip(),
-                                "duration": segment.get("end", 0) - segment.get("start", 0)
-                            }
-                            all_transcripts.append(transcript_entry)
-                    
-                    # 現在の開始時間を更新
-                    if audio_segments.index(segment_path) < len(audio_segments) - 1:
-                        # 最後のセグメント以外は次のセグメントの開始時間を調整
-                        current_start_time += 600  # 10分（600秒）ごとのセグメント
-                    
-            except Exception as e:
-                print(f"文字起こしエラー: {e}")
-                
-            # レート制限対策
-            time.sleep(1)
                 
-        # 一時ディレクトリを削除
-        if file_size > 24:
-            for segment_path in audio_segments:
+                # レート制限・一時的なエラーの場合は指定された時間（なければ指数的に延ばした時間）待って再送
+                if response.status_code not in self.RETRY_STATUS_CODES or attempt == self.MAX_RETRIES:
+                    break
                 try:
-                    os.remove(segment_path)
-                except:
-                    pass
-            try:
-                os.rmdir(temp_dir)
-            except:
-                pass
+                    wait = float(response.headers.get("Retry-After", ""))
+                except ValueError:
+                    wait = 2.0 ** attempt
+                print(f"API エラー {response.status_code} のため {wait:.0f} 秒後に再送します")
+                time.sleep(wait)
+                
+            if response.status_code != 200:
+                print(f"API エラー: {response.status_code}")
+                # 502などで大きなHTMLが返る場合もあるため、先頭だけを表示する
+                print(response.text[:512])
+                return []
+                
+            result = response.json()
+            
+            # セグメントごとの結果を変換
+            transcripts = []
+            for segment in result.get("segments", []):
+                transcripts.append({
+                    "start": offset + segment.get("start", 0),
+                    "text": segment.get("text", "").strip(),
+                    "duration": segment.get("end", 0) - segment.get("start", 0)
+                })
+            return transcripts
+        except Exception as e:
+            print(f"文字起こしエラー: {e}")
+            return []
+            
+    def transcribe_audio(self, audio_path: str) -> List[Dict[str, Any]]:
+        """Whisper APIを使用して音声を文字起こしする。
+        
+        長い音声は SEGMENT_LENGTH 秒ごとに分割し、複数のリクエストを並行して送信します。
+        
+        Args:
+            audio_path: 音声ファイル（または動画ファイル）のパス
+            
+        Returns:
+            List[Dict[str, Any]]: 文字起こし結果（YouTube-Transcript-APIと互換性のある形式）
+        """
+        # 分割した音声は一時ディレクトリごと削除する（途中で例外が発生した場合も残さない）
+        with tempfile.TemporaryDirectory() as temp_dir:
+            audio_segments = self._split_audio(audio_path, temp_dir)
+            if not audio_segments:
+                return []
+            if len(audio_segments) > 1:
+                print(f"音声を {len(audio_segments)} セグメントに分割して文字起こしします")
+            
+            # 各セグメントを並行して文字起こし（APIの応答待ちを重ねる）
+            with ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as pool:
+                results = pool.map(lambda seg: self._transcribe_segment(*seg), audio_segments)
+                all_transcripts = [entry for result in results for entry in result]
+        all_transcripts.sort(key=lambda entry: entry["start"])
                 
         return all_transcripts
 
     def get_transcript(self, video_path: str, output_dir: str) -> List[Dict[str, Any]]:
         """動画から音声を抽出し、Whisper APIで文字起こしする。
         
+        音声の抽出と分割は _split_audio の1回のffmpeg実行でまとめて行い、
+        中間の音声ファイルは作成しません。
+        
         Args:
             video_path: 動画ファイルのパス
-            output_dir: 出力ディレクトリ
+            output_dir: 出力ディレクトリ（互換性のために保持）
             
         Returns:
             List[Dict[str, Any]]: 文字起こし結果
         """
-        # 音声抽出
-        audio_path = self.extract_audio(video_path, output_dir)
-        if not audio_path:
-            return []
-            
-        # 文字起こし
-        transcript = self.transcribe_audio(audio_path)
-        
-        # 音声ファイルを削除
-        try:
-            os.remove(audio_path)
-        except:
-            pass
-            
-        return transcript
+        return self.transcribe_audio(video_path)
 
 
 class TranscriptQualitySelector:
     """複数の字幕ソースから最適な字幕を選択するクラス。"""
     
+    # evaluate_transcript_quality が返すスコアの最大値
+    MAX_QUALITY_SCORE = 1.0
+    
     @staticmethod
     def evaluate_transcript_quality(transcript: List[Dict[str, Any]]) -> float:
         """字幕の品質スコアを計算する。
@@ -242,16 +244,12 @@ class TranscriptQualitySelector:
         if not transcript:
             return 0.0
             
-        # 評価指標
-        total_length = 0
-        word_count = 0
+        # 評価指標（単語数は空白でつないだ全文を一度だけ分割して数える。
+        # 区切りが空白のため、エントリごとに分割した場合と同じ数になる）
+        texts = [entry.get("text", "") for entry in transcript]
+        total_length = sum(map(len, texts))
+        word_count = len(" ".join(texts).split())
         segment_count = len(transcript)
-        
-        for entry in transcript:
-            text = entry.get("text", "")
-            total_length += len(text)
-            words = text.split()
-            word_count += len(words)
             
         # 平均文字数が多すぎる/少なすぎる場合はペナルティ
         avg_length = total_length / segment_count if segment_count > 0 else 0
@@ -273,6 +271,26 @@ class TranscriptQualitySelector:
         )
         
         return quality_score
+    
+    @staticmethod
+    def should_run_whisper(youtube_transcript: List[Dict[str, Any]],
+                           force_whisper: bool = False) -> bool:
+        """Whisper APIによる音声認識を行う必要があるかを判定する。
+        
+        品質比較ではWhisperのスコアがYouTubeの字幕より高い場合だけWhisperの結果が
+        選ばれるため、YouTubeの字幕が最高スコアであれば音声認識をしても結果は変わりません。
+        
+        Args:
+            youtube_transcript: YouTubeから取得した字幕
+            force_whisper: Whisperの結果を強制的に選択するフラグ
+            
+        Returns:
+            bool: 音声認識を行う必要がある場合はTrue
+        """
+        if force_whisper or not youtube_transcript:
+            return True
+        score = TranscriptQualitySelector.evaluate_transcript_quality(youtube_transcript)
+        return score < TranscriptQualitySelector.MAX_QUALITY_SCORE
         
     @staticmethod
     def select_best_transcript(youtube_transcript: List[Dict[str, Any]], 
@@ -301,6 +319,10 @@ class TranscriptQualitySelector:
             else:
                 return []
                 
+        # 一方しかない場合は比較せずにそれを使用
+        if not youtube_transcript or not whisper_transcript:
+            return whisper_transcript or youtube_transcript
+        
         # 通常の品質比較による選択
         youtube_score = TranscriptQualitySelector.evaluate_transcript_quality(youtube_transcript)
         whisper_score = TranscriptQualitySelector.evaluate_transcript_quality(whisper_transcript)
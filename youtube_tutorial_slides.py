@@ -7,12 +7,26 @@ PowerPointのスライドに変換します。
 
 import argparse
 import os
+import types
 
 from enhanced_youtube_extractor import EnhancedYouTubeTutorialExtractor
 
 
-def main():
-    """コマンドライン引数を解析し、スライド生成処理を実行する。"""
+# 動画ダウンロード品質ごとのyt-dlpのフォーマット指定（読み取り専用）
+VIDEO_FORMAT_MAP = types.MappingProxyType({
+    "best": "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]",
+    "high": "bestvideo[height<=1080][ext=mp4]+bestaudio[ext=m4a]/best[height<=1080][ext=mp4]",
+    "medium": "bestvideo[height<=720][ext=mp4]+bestaudio[ext=m4a]/best[height<=720][ext=mp4]",
+    "low": "bestvideo[height<=480][ext=mp4]+bestaudio[ext=m4a]/best[height<=480][ext=mp4]"
+})
+
+
+def build_parser():
+    """コマンドライン引数のパーサーを作成する。
+
+    Returns:
+        argparse.ArgumentParser: 引数パーサー
+    """
     parser = argparse.ArgumentParser(description="YouTube チュートリアル動画からスライドを生成（拡張版）")
     parser.add_argument("url", help="YouTube 動画の URL")
     parser.add_argument("--output", "-o", default="output", help="出力ディレクトリ")
@@ -40,11 +54,32 @@ def main():
         "--image-quality", "-iq", type=int, default=95, 
         help="画像品質 (1-100, 高いほど高品質。デフォルト: 95)")
     parser.add_argument(
-        "--video-quality", "-vq", choices=["best", "high", "medium", "low"], default="high", 
+        "--video-quality", "-vq", choices=list(VIDEO_FORMAT_MAP), default="high", 
         help="動画ダウンロード品質 (best=最高品質, high=高品質, medium=中品質, low=低品質。デフォルト: high)")
     parser.add_argument(
         "--no-thumbnail", action="store_true",
         help="最初のスライドにYouTubeサムネイルを追加しない")
+    parser.add_argument(
+        "--max-frame-width", type=int, default=1280,
+        help="保存するフレーム画像の最大幅 (ピクセル, 0で縮小しない。デフォルト: 1280)")
+    parser.add_argument(
+        "--sparse-download", action="store_true",
+        help="抽出時刻の前後だけを部分ダウンロードする（テキスト量による分割フレームは取得しない。Whisper API使用時は音声のみを別途ダウンロード）")
+    parser.add_argument(
+        "--similarity-method", choices=["histogram", "phash"], default="histogram",
+        help="画面変化検出の類似度の計算方法 (histogram=輝度ヒストグラム, phash=知覚ハッシュ。デフォルト: histogram)")
+    parser.add_argument(
+        "--refine-scene-changes", action="store_true",
+        help="インターバル間で画面が変化した場合、二分探索で変化直後のフレームを探して追加する")
+    parser.add_argument(
+        "--use-opencl", action="store_true",
+        help="画面変化検出用の縮小・グレースケール変換をOpenCLで行う（通常はCPUの方が速い）")
+    parser.add_argument(
+        "--hw-decode", action="store_true",
+        help="PyAVを使わない場合に、動画のデコードにハードウェアデコーダを使う")
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="抽出結果・字幕・動画情報のキャッシュ（出力ディレクトリの .cache）を使用しない")
     
     # Whisper API 関連のパラメータ
     parser.add_argument(
@@ -62,7 +97,16 @@ def main():
         "--no-force-whisper", action="store_true",
         help="Whisper API使用時に品質比較を行い、必ずしもWhisper APIの結果を優先しないようにする")
     
-    args = parser.parse_args()
+    return parser
+
+
+# コマンドライン引数のパーサー（モジュールの読み込み時に一度だけ作成する）
+PARSER = build_parser()
+
+
+def main():
+    """コマンドライン引数を解析し、スライド生成処理を実行する。"""
+    args = PARSER.parse_args()
     
     # 文字量閾値の調整（無効化オプションが指定されていれば最大値に設定）
     text_threshold = 1000000 if args.disable_text_split else args.text_threshold
@@ -71,13 +115,7 @@ def main():
     change_threshold = 0.0 if args.disable_change_detection else args.change_threshold
     
     # 動画品質設定の変換
-    video_format_map = {
-        "best": "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]",
-        "high": "bestvideo[height<=1080][ext=mp4]+bestaudio[ext=m4a]/best[height<=1080][ext=mp4]",
-        "medium": "bestvideo[height<=720][ext=mp4]+bestaudio[ext=m4a]/best[height<=720][ext=mp4]",
-        "low": "bestvideo[height<=480][ext=mp4]+bestaudio[ext=m4a]/best[height<=480][ext=mp4]"
-    }
-    video_format = video_format_map.get(args.video_quality, video_format_map["high"])
+    video_format = VIDEO_FORMAT_MAP.get(args.video_quality, VIDEO_FORMAT_MAP["high"])
     
     # Whisper APIキーの取得（コマンドライン引数 > 環境変数）
     whisper_api_key = args.whisper_api_key
@@ -107,7 +145,14 @@ def main():
         use_whisper=args.use_whisper,
         whisper_api_key=whisper_api_key,
         whisper_model=args.whisper_model,
-        force_whisper=force_whisper
+        force_whisper=force_whisper,
+        sparse_download=args.sparse_download,
+        use_cache=not args.no_cache,
+        refine_scene_changes=args.refine_scene_changes,
+        similarity_method=args.similarity_method,
+        max_frame_width=args.max_frame_width,
+        use_opencl=args.use_opencl,
+        hw_decode=args.hw_decode
     )
     
     result_path = extractor.process()